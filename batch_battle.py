@@ -0,0 +1,724 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+# Add the script's directory to the Python path
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(script_dir)
+
+from gamedata import (
+    ALL_MOVES,
+    STATUS_EFFECTS,
+    SYNERGY_EFFECTS,
+    EFFECT_STATUS,
+    EFFECT_STAGES,
+    EFFECT_RECOIL,
+)
+from knight_battle_game import Knight, Player, Warband, STAGE_MULTIPLIERS
+from headless_battle import HeadlessBattle
+from knight_ai_training import RandomPolicy
+
+# --- Lockstep Batch Engine ---
+#
+# BatchBattle plays N battles between two fixed warbands at once. Every piece
+# of battle state is a NumPy array with one row per battle, and each step of
+# a round (choose, order, act, end of round) is applied to all rows together.
+# The rules mirror HeadlessBattle exactly, with every knight choosing a
+# uniformly random move, i.e. the behaviour of an untrained brain.
+
+MAX_TARGETS = 3
+MAX_ROUNDS = 50
+
+# State indices
+BURNED, SLOWED, CURSED, DAZED, VULNERABLE, WEAKEN = (
+    STATUS_EFFECTS.index(s)
+    for s in ("burned", "slowed", "cursed", "dazed", "vulnerable", "weaken")
+)
+CONSECRATION, EYE_OF_THE_STORM, INVISIBLE, MISTS_OF_BOREALIS = (
+    SYNERGY_EFFECTS.index(e)
+    for e in ("consecration", "eye_of_the_storm", "invisible", "mists_of_borealis")
+)
+STAT_INDEX = {"atk": 0, "def": 1, "spd": 2}
+
+WEATHERS = [
+    "Clear",
+    "Blazing Sun",
+    "Metalstorm",
+    "Hailstorm",
+    *sorted(
+        {m.sets_weather for m in ALL_MOVES.values() if m.sets_weather}
+        - {"Blazing Sun", "Metalstorm", "Hailstorm"}
+    ),
+]
+CLEAR, BLAZING_SUN, METALSTORM, HAILSTORM = range(4)
+
+TARGET_TYPES = [
+    "self",
+    "single_ally",
+    "team_synergy",
+    "all_enemies",
+    "all_adjacent",
+    "single_enemy",
+]
+SELF, SINGLE_ALLY, TEAM_SYNERGY, ALL_ENEMIES, ALL_ADJACENT, SINGLE_ENEMY = range(6)
+
+STAGE_TABLE = np.array([STAGE_MULTIPLIERS[s] for s in range(-6, 7)])
+
+
+def _move_tables():
+    """Column per Move attribute, indexed by move id."""
+    moves = list(ALL_MOVES.values())
+    ids = {m.name: i for i, m in enumerate(moves)}
+    count = len(moves)
+    t = {
+        "power": np.array([m.power for m in moves], dtype=np.int64),
+        "accuracy": np.array([m.accuracy for m in moves], dtype=np.float64),
+        "target": np.array([TARGET_TYPES.index(m.target_type) for m in moves]),
+        "priority": np.array([m.priority for m in moves], dtype=np.int64),
+        "charge": np.array([m.charge_turns > 0 for m in moves]),
+        "rampage": np.array([m.rampage_turns > 0 for m in moves]),
+        "guard_mult": np.array([m.guard_multiplier for m in moves]),
+        "protect": np.array([m.is_protection_move for m in moves]),
+        "chance": np.array([m.effect_chance / 100 for m in moves]),
+        "duration": np.array([m.effect_duration for m in moves], dtype=np.int64),
+        "weather": np.array(
+            [WEATHERS.index(m.sets_weather) if m.sets_weather else -1 for m in moves]
+        ),
+        "synergy": np.array(
+            [
+                SYNERGY_EFFECTS.index(m.synergy_effect) if m.synergy_effect else -1
+                for m in moves
+            ]
+        ),
+    }
+    # Compiled effects flattened into (kind, status, stage deltas, recoil)
+    for prefix, attr in (("fx", "effect_op"), ("self", "self_effect_op")):
+        kind = np.full(count, -1)
+        status = np.full(count, -1)
+        stages = np.zeros((count, 3), dtype=np.int64)
+        for i, m in enumerate(moves):
+            op = getattr(m, attr)
+            if op is None:
+                continue
+            kind[i] = op.kind
+            if op.kind == EFFECT_STATUS:
+                status[i] = STATUS_EFFECTS.index(op.status)
+            for stat_key, _, delta in op.stages:
+                stages[i, STAT_INDEX[stat_key]] += delta
+        t[prefix + "_kind"] = kind
+        t[prefix + "_status"] = status
+        t[prefix + "_stages"] = stages
+    return ids, t
+
+
+MOVE_IDS, MOVES = _move_tables()
+SPECIAL = {
+    name: MOVE_IDS[name]
+    for name in (
+        "Blazing Judgment",
+        "Umbral Step",
+        "Mists of Borealis",
+        "Parry",
+        "Royal Aegis",
+        "Shield Wall",
+        "Bulwark Charge",
+        "Heavenly Blessing",
+    )
+}
+
+
+class BatchBattle:
+    """N lockstep battles between two warbands, with random-move players."""
+
+    def __init__(self, team1_data, team2_data, n, seed=None, max_rounds=MAX_ROUNDS):
+        self.n = n
+        self.max_rounds = max_rounds
+        self.seed = seed if seed is not None else int.from_bytes(os.urandom(8), "big")
+        self.rng = np.random.default_rng(self.seed)
+        self._load_roster(list(team1_data), list(team2_data))
+        self._reset()
+
+    # --- Setup ---
+    def _load_roster(self, team1_data, team2_data):
+        if not team1_data or not team2_data:
+            raise ValueError("BatchBattle needs at least one knight on each side")
+        knights = [Knight(data) for data in team1_data + team2_data]
+        sizes = (len(team1_data), len(team2_data))
+        # Knight indices of each side's team, in roster order
+        self.teams = (np.arange(sizes[0]), np.arange(sizes[0], len(knights)))
+        self.names = [k.name for k in knights]
+        self.base = np.array(
+            [
+                [k.base_stats["atk"], k.base_stats["def"], k.base_stats["spd"]]
+                for k in knights
+            ],
+            dtype=np.float64,
+        )
+        self.max_hp = np.array([k.max_hp for k in knights], dtype=np.float64)
+        self.side = np.repeat([0, 1], sizes)
+
+        def has(ability):
+            return np.array([k.ability.name == ability for k in knights])
+
+        def faction(name):
+            return np.array([k.faction == name for k in knights])
+
+        self.faction = np.array([k.faction for k in knights])
+        self.steel = faction("Steel")
+        self.cryo = faction("Cryo")
+        self.adrenaline = has("Adrenaline")
+        self.last_stand = has("Last Stand")
+        self.divine_power = has("Divine Power")
+        self.grounded = has("Grounded")
+        self.chilling_finesse = has("Chilling Finesse")
+        self.witch_doctor = has("Witch Doctor")
+        self.reinforced = has("Reinforced")
+        self.permafrost = has("Permafrost")
+        self.ice_shield = has("Ice Shield")
+        self.soul_ablaze = has("Soul Ablaze")
+
+        width = max(len(k.moves) for k in knights)
+        self.move_count = np.array([len(k.moves) for k in knights])
+        self.moves = np.zeros((len(knights), width), dtype=np.int64)
+        for i, k in enumerate(knights):
+            self.moves[i, : len(k.moves)] = [MOVE_IDS[m.name] for m in k.moves]
+
+    def _reset(self):
+        n = self.n
+        knights = len(self.names)
+        self.hp = np.tile(self.max_hp, (n, 1))
+        self.guard = np.zeros((n, knights), dtype=np.int64)
+        self.stages = np.zeros((n, knights, 3), dtype=np.int64)
+        self.status = np.zeros((n, knights, len(STATUS_EFFECTS)), dtype=np.int64)
+        self.effects = np.zeros((n, knights, len(SYNERGY_EFFECTS)), dtype=np.int64)
+        self.fainted = np.zeros((n, knights), dtype=bool)
+        self.invisible = np.zeros((n, knights), dtype=bool)
+        self.parrying = np.zeros((n, knights), dtype=bool)
+        self.aegis = np.zeros((n, knights), dtype=bool)
+        self.protects = np.zeros((n, knights), dtype=np.int64)
+        self.last_damage = np.zeros((n, knights), dtype=np.int64)
+        self.charge_move = np.full((n, knights), -1)
+        self.charge_targets = np.full((n, knights, MAX_TARGETS), -1)
+        self.aoe_protected = np.zeros((n, 2), dtype=bool)
+        self.weather = np.zeros(n, dtype=np.int64)
+        self.weather_turns = np.zeros(n, dtype=np.int64)
+        # active[b, side, slot] holds a knight index or -1 for an empty slot
+        start = [[*team[:2], *[-1] * (2 - len(team[:2]))] for team in self.teams]
+        self.active = np.array([start] * n)
+        self.running = np.ones(n, dtype=bool)
+        self.turns = np.ones(n, dtype=np.int64)
+
+    # --- Effective Stats ---
+    def attack(self, b, k):
+        val = self.base[k, 0] * STAGE_TABLE[self.stages[b, k, 0] + 6]
+        status = self.status[b, k]
+        val = np.where(status[:, WEAKEN] > 0, val * 0.75, val)
+        val = np.where(self.adrenaline[k] & status.any(axis=1), val * 1.5, val)
+        low = self.last_stand[k] & (self.hp[b, k] <= self.max_hp[k] / 3)
+        val = np.where(low, val * 1.5, val)
+        sun = self.divine_power[k] & (self.weather[b] == BLAZING_SUN)
+        val = np.where(sun, val * 1.5, val)
+        return np.trunc(val).astype(np.int64)
+
+    def defense(self, b, k):
+        val = self.base[k, 1] * STAGE_TABLE[self.stages[b, k, 1] + 6]
+        val = np.where(self.status[b, k, VULNERABLE] > 0, val * 0.75, val)
+        weather = self.weather[b]
+        val = np.where((weather == METALSTORM) & self.steel[k], val * 1.2, val)
+        val = np.where((weather == HAILSTORM) & self.cryo[k], val * 1.2, val)
+        return np.trunc(val).astype(np.int64)
+
+    def speed(self, b, k):
+        val = self.base[k, 2] * STAGE_TABLE[self.stages[b, k, 2] + 6]
+        slowed = (self.status[b, k, SLOWED] > 0) & ~self.grounded[k]
+        val = np.where(slowed, val * 0.75, val)
+        chill = self.chilling_finesse[k] & (self.weather[b] == HAILSTORM)
+        val = np.where(chill, val * 2, val)
+        return np.trunc(val).astype(np.int64)
+
+    # --- Knight Rules ---
+    def apply_status(self, b, k, status, duration, attacker):
+        blocked = (status == SLOWED) & self.grounded[k]
+        fresh = ~blocked & (self.status[b, k, status] <= 0)
+        duration = duration + np.where(self.witch_doctor[attacker], 2, 0)
+        b, k, status, duration = b[fresh], k[fresh], status[fresh], duration[fresh]
+        self.status[b, k, status] = duration
+
+    def apply_stages(self, b, k, deltas):
+        self.stages[b, k] = np.clip(self.stages[b, k] + deltas, -6, 6)
+
+    def take_damage(self, b, k, damage, move):
+        effects = self.effects[b, k]
+        evaded = (effects[:, EYE_OF_THE_STORM] > 0) & (self.rng.random(len(b)) < 0.3)
+        damage = damage.astype(np.float64)
+        damage = np.where(
+            effects[:, MISTS_OF_BOREALIS] > 0, np.trunc(damage * 0.5), damage
+        )
+        damage = np.where(self.reinforced[k], np.trunc(damage * 0.9), damage)
+        damage = np.where(
+            self.permafrost[k] & MOVES["rampage"][move], np.trunc(damage * 0.5), damage
+        )
+        damage = damage.astype(np.int64)
+
+        guard = self.guard[b, k]
+        guarded = guard > 0
+        reduction = np.minimum(guard, np.trunc(damage * 0.5).astype(np.int64))
+        reduction = np.where(guarded, reduction, 0)
+        damage = damage - reduction
+        gm = MOVES["guard_mult"][move]
+        depletion = np.where(
+            gm > 1.0, np.trunc(reduction * gm * 0.25).astype(np.int64), reduction
+        )
+        guard = np.where(guarded, np.maximum(guard - depletion, 0), guard)
+
+        final = np.maximum(1, damage)
+        hit = ~evaded
+        hb, hk, final = b[hit], k[hit], final[hit]
+        self.guard[hb, hk] = guard[hit]
+        self.hp[hb, hk] -= final
+        self.last_damage[hb, hk] = final
+        self.guard[hb, hk] += np.where(
+            self.ice_shield[hk], np.trunc(final * 0.15).astype(np.int64), 0
+        )
+        down = self.hp[hb, hk] <= 0
+        self.hp[hb[down], hk[down]] = 0
+        self.fainted[hb[down], hk[down]] = True
+
+        dealt = np.zeros(len(b), dtype=np.int64)
+        dealt[hit] = final
+        return dealt
+
+    def apply_compiled(self, b, k, move, prefix, duration, attacker):
+        """Run a move's compiled effect (prefix "fx") or self effect ("self")."""
+        kind = MOVES[prefix + "_kind"][move]
+        status = kind == EFFECT_STATUS
+        if status.any():
+            self.apply_status(
+                b[status],
+                k[status],
+                MOVES[prefix + "_status"][move[status]],
+                duration[status],
+                attacker[status],
+            )
+        recoil = kind == EFFECT_RECOIL
+        # Recoil is always called without the damage dealt, so it costs 1 HP.
+        self.hp[b[recoil], k[recoil]] -= 1
+        stages = kind == EFFECT_STAGES
+        if stages.any():
+            self.apply_stages(
+                b[stages], k[stages], MOVES[prefix + "_stages"][move[stages]]
+            )
+
+    # --- Battle Rules ---
+    def is_active(self, b, k):
+        side = self.side[k]
+        return (self.active[b, side, 0] == k) | (self.active[b, side, 1] == k)
+
+    def has_living(self, side):
+        team = self.teams[side]
+        return ~self.fainted[:, team].all(axis=1)
+
+    def choose(self, b, k):
+        """Random move and AIBrain-style targets for knight k in each battle b."""
+        count = len(b)
+        move = self.moves[k, (self.rng.random(count) * self.move_count[k]).astype(int)]
+        side = self.side[k]
+        mine = self.active[b, side]
+        theirs = self.active[b, 1 - side]
+
+        def alive(slots):
+            ok = slots >= 0
+            return ok & ~self.fainted[b[:, None], np.where(ok, slots, 0)]
+
+        ally_ok = alive(mine) & (mine != k[:, None])
+        has_ally = ally_ok.any(axis=1)
+        ally = np.where(has_ally, mine[np.arange(count), ally_ok.argmax(axis=1)], -1)
+        foes_ok = alive(theirs)
+        foes = np.where(foes_ok, theirs, -1)
+        # Foes are listed in slot order, skipping empty or fainted slots
+        foes = np.where(foes_ok[:, :1], foes, foes[:, ::-1])
+        foes[:, 1] = np.where(foes_ok.all(axis=1), theirs[:, 1], -1)
+
+        targets = np.full((count, MAX_TARGETS), -1)
+        ttype = MOVES["target"][move]
+        targets[:, 0] = np.where(ttype == SELF, k, targets[:, 0])
+        single_ally = ttype == SINGLE_ALLY
+        targets[:, 0] = np.where(
+            single_ally, np.where(has_ally, ally, k), targets[:, 0]
+        )
+        synergy = ttype == TEAM_SYNERGY
+        targets[:, 0] = np.where(synergy, k, targets[:, 0])
+        targets[:, 1] = np.where(synergy, ally, targets[:, 1])
+        aoe = (ttype == ALL_ENEMIES) | (ttype == ALL_ADJACENT)
+        targets[:, :2] = np.where(aoe[:, None], foes, targets[:, :2])
+        adjacent = ttype == ALL_ADJACENT
+        # The ally goes right after however many foes were listed
+        n_foes = (foes >= 0).sum(axis=1)
+        rows = np.arange(count)[adjacent]
+        targets[rows, n_foes[adjacent]] = ally[adjacent]
+
+        single = ttype == SINGLE_ENEMY
+        visible = (
+            foes_ok & ~self.invisible[b[:, None], np.where(theirs >= 0, theirs, 0)]
+        )
+        n_visible = visible.sum(axis=1)
+        pick = (self.rng.random(count) * np.maximum(n_visible, 1)).astype(int)
+        # pick-th visible foe: first visible if pick == 0, else the second slot
+        first = visible.argmax(axis=1)
+        chosen = np.where(pick == 0, first, 1)
+        target = theirs[np.arange(count), chosen]
+        targets[:, 0] = np.where(single & (n_visible > 0), target, targets[:, 0])
+        return move, targets
+
+    def prepare_round(self, b):
+        self.aoe_protected[b] = False
+        self.parrying[b] = False
+        self.aegis[b] = False
+        self.last_damage[b] = 0
+
+    def get_all_actions(self, b):
+        """Queue up to four actions per battle, in the order they will run."""
+        count = len(b)
+        actors = self.active[b].reshape(count, 4)
+        present = actors >= 0
+        safe = np.where(present, actors, 0)
+        rows = np.repeat(b, 4)
+        living = present & ~self.fainted[b[:, None], safe]
+        speed = self.speed(rows, safe.ravel()).reshape(count, 4)
+
+        acting = living & (self.status[b[:, None], safe, DAZED] <= 0)
+        moves = np.full((count, 4), -1)
+        targets = np.full((count, 4, MAX_TARGETS), -1)
+        for slot in range(4):
+            sel = acting[:, slot]
+            bb, kk = b[sel], safe[sel, slot]
+            charging = self.charge_move[bb, kk] >= 0
+            # Charged moves are replayed with their stored targets
+            queued_move = self.charge_move[bb, kk]
+            queued_targets = self.charge_targets[bb, kk]
+            self.charge_move[bb, kk] = -1
+            move, tgt = self.choose(bb, kk)
+            moves[sel, slot] = np.where(charging, queued_move, move)
+            targets[sel, slot] = np.where(charging[:, None], queued_targets, tgt)
+
+        priority = np.where(acting, MOVES["priority"][np.maximum(moves, 0)], 0)
+        slot_order = np.tile(np.arange(4), (count, 1))
+        order = np.lexsort((slot_order, -speed, -priority, ~acting), axis=-1)
+        take = np.arange(count)[:, None]
+        actors = np.where(acting, actors, -1)[take, order]
+        return actors, moves[take, order], targets[take, order]
+
+    def execute_action(self, b, a, move, targets):
+        skip = (move == SPECIAL["Blazing Judgment"]) & (self.weather[b] == BLAZING_SUN)
+        # HeadlessBattle clears charge_state when it queues the charged move,
+        # so a charge move charges again every round unless it skips charging.
+        charging = MOVES["charge"][move] & ~skip
+        if charging.any():
+            cb, ca = b[charging], a[charging]
+            self.charge_move[cb, ca] = move[charging]
+            self.charge_targets[cb, ca] = targets[charging]
+            umbral = move[charging] == SPECIAL["Umbral Step"]
+            self.invisible[cb[umbral], ca[umbral]] = True
+            self.effects[cb[umbral], ca[umbral], INVISIBLE] = 2
+        go = ~charging
+        b, a, move, targets = b[go], a[go], move[go], targets[go]
+
+        power = MOVES["power"][move]
+        reappear = self.invisible[b, a] & (power > 0)
+        self.invisible[b[reappear], a[reappear]] = False
+        self.effects[b[reappear], a[reappear], INVISIBLE] = 0
+        cursed = (power > 0) & (self.status[b, a, CURSED] > 0)
+        self.hp[b[cursed], a[cursed]] -= self.max_hp[a[cursed]] * 0.2
+
+        failed = (move == SPECIAL["Mists of Borealis"]) & (self.weather[b] != HAILSTORM)
+        protect = MOVES["protect"][move] & ~failed
+        fail_chance = 1 - 0.5 ** self.protects[b, a]
+        protect_failed = protect & (self.rng.random(len(b)) < fail_chance)
+        # A move that fails outright leaves the protect streak alone
+        streak = self.protects[b, a]
+        streak = np.where(
+            protect & ~protect_failed, streak + 1, np.where(failed, streak, 0)
+        )
+        self.protects[b, a] = streak
+        done = failed | protect_failed
+
+        parry = ~done & (move == SPECIAL["Parry"])
+        self.parrying[b[parry], a[parry]] = True
+        self.apply_compiled(
+            b[parry], a[parry], move[parry], "self", np.full(parry.sum(), 2), a[parry]
+        )
+        aegis = ~done & (move == SPECIAL["Royal Aegis"])
+        self.aegis[b[aegis], a[aegis]] = True
+        wall = ~done & (move == SPECIAL["Shield Wall"])
+        self.aoe_protected[b[wall], self.side[a[wall]]] = True
+        done |= parry | aegis | wall
+
+        ttype = MOVES["target"][move]
+        synergy = ~done & (ttype == TEAM_SYNERGY)
+        ally = targets[:, 1]
+        resonate = synergy & (ally >= 0)
+        resonate[resonate] = self.faction[ally[resonate]] == self.faction[a[resonate]]
+        lone = synergy & ~resonate
+        self.apply_move_effect(b[lone], a[lone], move[lone], a[lone])
+        for slot in range(2):
+            sel = resonate & (targets[:, slot] >= 0)
+            self.apply_move_effect(b[sel], a[sel], move[sel], targets[sel, slot])
+
+        normal = ~done & ~synergy
+        for slot in range(MAX_TARGETS):
+            t = targets[:, slot]
+            sel = normal & (t >= 0)
+            sel[sel] = ~self.fainted[b[sel], t[sel]]
+            self.apply_move_effect(b[sel], a[sel], move[sel], t[sel])
+
+    def apply_move_effect(self, b, a, move, t):
+        if len(b) == 0:
+            return
+        ttype = MOVES["target"][move]
+        power = MOVES["power"][move]
+        missed = self.rng.random(len(b)) * 100 > MOVES["accuracy"][move]
+        missed |= self.invisible[b, t] & (ttype == SINGLE_ENEMY)
+        aoe = (ttype == ALL_ENEMIES) | (ttype == ALL_ADJACENT)
+        missed |= aoe & self.aoe_protected[b, self.side[t]] & self.is_active(b, t)
+        parried = ~missed & self.parrying[b, t]
+        blocked = ~missed & ~parried & self.aegis[b, t]
+        weakened = blocked & (power > 0)
+        self.apply_status(
+            b[weakened],
+            a[weakened],
+            np.full(weakened.sum(), WEAKEN),
+            np.full(weakened.sum(), 2),
+            t[weakened],
+        )
+        go = ~(missed | parried | blocked)
+        b, a, move, t, ttype, power = (
+            b[go],
+            a[go],
+            move[go],
+            t[go],
+            ttype[go],
+            power[go],
+        )
+
+        bulwark = move == SPECIAL["Bulwark Charge"]
+        damage = np.trunc(self.last_damage[b, a] * 1.5).astype(np.int64)
+        hits = bulwark & (damage > 0)
+        self.take_damage(b[hits], t[hits], damage[hits], move[hits])
+
+        heal = move == SPECIAL["Heavenly Blessing"]
+        hb, ht = b[heal], t[heal]
+        share = np.where(self.weather[hb] == BLAZING_SUN, 0.50, 0.35)
+        amount = np.trunc(self.max_hp[ht] * share)
+        self.hp[hb, ht] = np.minimum(self.max_hp[ht], self.hp[hb, ht] + amount)
+
+        go = ~(bulwark | heal)
+        b, a, move, t, ttype, power = (
+            b[go],
+            a[go],
+            move[go],
+            t[go],
+            ttype[go],
+            power[go],
+        )
+
+        strike = power > 0
+        sb, sa, st, sm = b[strike], a[strike], t[strike], move[strike]
+        damage = (self.attack(sb, sa) * power[strike]) // np.maximum(
+            1, self.defense(sb, st)
+        )
+        dealt = self.take_damage(sb, st, damage, sm)
+        landed = dealt > 0
+        burn = landed & (self.effects[sb, st, CONSECRATION] > 0)
+        burn &= ttype[strike] == SINGLE_ENEMY
+        self.apply_status(
+            sb[burn],
+            sa[burn],
+            np.full(burn.sum(), BURNED),
+            np.full(burn.sum(), 3),
+            st[burn],
+        )
+        ablaze = landed & self.soul_ablaze[st]
+        ablaze[ablaze] = self.rng.random(ablaze.sum()) < 0.3
+        self.apply_status(
+            sb[ablaze],
+            sa[ablaze],
+            np.full(ablaze.sum(), BURNED),
+            np.full(ablaze.sum(), 3),
+            st[ablaze],
+        )
+
+        has_effect = MOVES["fx_kind"][move] >= 0
+        has_effect[has_effect] = (
+            self.rng.random(has_effect.sum()) <= MOVES["chance"][move[has_effect]]
+        )
+        e = has_effect
+        self.apply_compiled(b[e], t[e], move[e], "fx", MOVES["duration"][move[e]], a[e])
+
+        weather = MOVES["weather"][move]
+        w = weather >= 0
+        self.weather[b[w]] = weather[w]
+        self.weather_turns[b[w]] = 5
+
+        s = MOVES["self_kind"][move] >= 0
+        self.apply_compiled(b[s], a[s], move[s], "self", np.full(s.sum(), 2), a[s])
+
+        synergy = MOVES["synergy"][move]
+        y = synergy >= 0
+        self.effects[b[y], t[y], synergy[y]] = MOVES["duration"][move[y]]
+        shroud = y & (synergy == INVISIBLE)
+        self.invisible[b[shroud], t[shroud]] = True
+
+    def process_fainted(self, b):
+        for side in (0, 1):
+            team = self.teams[side]
+            for slot in (0, 1):
+                k = self.active[b, side, slot]
+                down = k >= 0
+                down[down] = self.fainted[b[down], k[down]]
+                if not down.any():
+                    continue
+                db = b[down]
+                active = self.active[db, side]
+                bench = ~self.fainted[db][:, team]
+                bench &= (team[None, :] != active[:, :1]) & (
+                    team[None, :] != active[:, 1:]
+                )
+                self.active[db, side, slot] = np.where(
+                    bench.any(axis=1), team[bench.argmax(axis=1)], -1
+                )
+
+    def end_of_round_effects(self, b):
+        turns = self.weather_turns[b]
+        ticking = turns > 0
+        turns = np.where(ticking, turns - 1, turns)
+        self.weather_turns[b] = turns
+        self.weather[b] = np.where(ticking & (turns == 0), CLEAR, self.weather[b])
+
+        for side in (0, 1):
+            for slot in (0, 1):
+                k = self.active[b, side, slot]
+                sel = k >= 0
+                sel[sel] = ~self.fainted[b[sel], k[sel]]
+                kb, kk = b[sel], k[sel]
+                burned = self.status[kb, kk, BURNED] > 0
+                self.hp[kb[burned], kk[burned]] -= np.trunc(
+                    self.max_hp[kk[burned]] * 0.15
+                )
+                dazed = self.status[kb, kk, DAZED] > 0
+                dazed &= self.rng.random(len(kb)) < 0.5
+                self.status[kb[dazed], kk[dazed], DAZED] = 0
+
+                status = self.status[kb, kk]
+                self.status[kb, kk] = np.where(status > 1, status - 1, 0)
+                effects = self.effects[kb, kk]
+                self.effects[kb, kk] = np.where(effects > 1, effects - 1, 0)
+                unveiled = effects[:, INVISIBLE] == 1
+                self.invisible[kb[unveiled], kk[unveiled]] = False
+
+    # --- Main Loop ---
+    def both_alive(self, b):
+        return self.has_living(0)[b] & self.has_living(1)[b]
+
+    def run(self):
+        self.running = self.both_alive(np.arange(self.n))
+        round_num = 1
+        while round_num < self.max_rounds:
+            b = np.flatnonzero(self.running)
+            if len(b) == 0:
+                break
+            self.turns[b] = round_num
+            self.prepare_round(b)
+            actors, moves, targets = self.get_all_actions(b)
+            live = np.ones(len(b), dtype=bool)
+            for pos in range(4):
+                a = actors[:, pos]
+                sel = live & (a >= 0)
+                sel[sel] = ~self.fainted[b[sel], a[sel]]
+                self.execute_action(b[sel], a[sel], moves[sel, pos], targets[sel, pos])
+                self.process_fainted(b[sel])
+                live &= self.both_alive(b)
+            self.running[b] = live
+            self.end_of_round_effects(b[live])
+            round_num += 1
+        self.turns[self.running] = round_num
+        return self.results()
+
+    def results(self):
+        p1 = self.has_living(0)
+        p2 = self.has_living(1)
+        return {
+            "winner": np.where(p1 & ~p2, 1, np.where(p2 & ~p1, 2, 0)),
+            "p1_survivors": (~self.fainted[:, self.teams[0]]).sum(axis=1),
+            "p2_survivors": (~self.fainted[:, self.teams[1]]).sum(axis=1),
+            "turns": self.turns.copy(),
+        }
+
+
+def run_headless(team1_data, team2_data, battles, seed=None):
+    """The same matchup through HeadlessBattle, one battle at a time."""
+    rng = np.random.default_rng(seed)
+    warband1, warband2 = Warband(team1_data), Warband(team2_data)
+    logs = []
+    for _ in range(battles):
+        p1 = Player("P1", warband1.knights())
+        p1.ai_logic = RandomPolicy()
+        p2 = Player("P2", warband2.knights())
+        p2.ai_logic = RandomPolicy()
+        battle = HeadlessBattle(p1, p2, seed=int(rng.integers(2**63)))
+        logs.append(battle.run_simulation())
+    return {
+        "winner": np.array([{"P1": 1, "P2": 2}.get(log["winner"], 0) for log in logs]),
+        "p1_survivors": np.array([log["p1_survivors"] for log in logs]),
+        "p2_survivors": np.array([log["p2_survivors"] for log in logs]),
+        "turns": np.array([log["turns"] for log in logs]),
+    }
+
+
+def describe(results):
+    n = len(results["winner"])
+    p1 = (results["winner"] == 1).mean()
+    return (
+        f"P1 win {p1:.3f} ± {1.96 * np.sqrt(p1 * (1 - p1) / n):.3f} | "
+        f"draw {(results['winner'] == 0).mean():.3f} | "
+        f"turns {results['turns'].mean():.2f} | "
+        f"survivors {results['p1_survivors'].mean():.2f}/"
+        f"{results['p2_survivors'].mean():.2f}"
+    )
+
+
+def load_team(path):
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark the lockstep batch engine against HeadlessBattle."
+    )
+    parser.add_argument("team1", nargs="?", default="co.json")
+    parser.add_argument("team2", nargs="?", default="ug.json")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--reference", type=int, default=2000)
+    args = parser.parse_args()
+
+    team1 = load_team(os.path.join(script_dir, args.team1))
+    team2 = load_team(os.path.join(script_dir, args.team2))
+
+    for size in (1, 100, 10_000):
+        start = time.perf_counter()
+        results = BatchBattle(team1, team2, size, seed=args.seed).run()
+        elapsed = time.perf_counter() - start
+        print(f"BatchBattle N={size:>6}: {size / elapsed:10.0f} battles/sec")
+    print(f"  batch     {describe(results)}")
+
+    start = time.perf_counter()
+    reference = run_headless(team1, team2, args.reference, seed=args.seed)
+    elapsed = time.perf_counter() - start
+    print(
+        f"HeadlessBattle x{args.reference}: {args.reference / elapsed:.0f} battles/sec"
+    )
+    print(f"  headless  {describe(reference)}")
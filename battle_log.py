@@ -0,0 +1,197 @@
+import sys
+
+# --- Battle Event Stream ---
+#
+# Battles record events as a code plus the raw arguments. Nothing is
+# formatted until a sink asks for text, and with no sink attached an event
+# is dropped as soon as it is emitted.
+
+# --- Event Codes ---
+TEXT = 0
+ROUND_START = 1
+ROUND_END = 2
+DAZED_SKIP = 3
+SWITCH = 4
+SENDS_OUT = 5
+CHARGE_START = 6
+VANISH = 7
+CHARGE_RELEASE = 8
+REAPPEAR = 9
+CURSE_DAMAGE = 10
+MOVE_FAILED = 11
+PROTECT_FAILED = 12
+PARRY_STANCE = 13
+AEGIS_RAISED = 14
+SHIELD_WALL = 15
+SYNERGY = 16
+MISS = 17
+MISS_INVISIBLE = 18
+SHIELD_WALL_BLOCK = 19
+PARRIED = 20
+MOVE_DISABLED = 21
+AEGIS_BLOCK = 22
+MOVE_USED = 23
+DAMAGE = 24
+FAILED = 25
+HEAL = 26
+SOUL_ABLAZE = 27
+WEATHER_SET = 28
+SYNERGY_EFFECT = 29
+FAINTED = 30
+TEAM_DEFEATED = 31
+WEATHER_END = 32
+WEATHER_CONTINUES = 33
+BURN_DAMAGE = 34
+DAZE_CLEARED = 35
+EVADE = 36
+GUARD_REDUCED = 37
+GUARD_BROKEN = 38
+ICE_SHIELD = 39
+RECOIL = 40
+STAT_UP = 41
+STAT_DOWN = 42
+STATUS_APPLIED = 43
+STATUS_ALREADY = 44
+STATUS_BLOCKED = 45
+STATUS_ENDED = 46
+EFFECT_ENDED = 47
+MOVE_ENABLED = 48
+
+STATUS_MESSAGES = {
+    "burned": "was set ablaze",
+    "slowed": "felt a chill slow their pace",
+    "cursed": "felt dread creep around their mind",
+    "dazed": "clutched their helm in a daze",
+    "vulnerable": "felt their armor splinter",
+    "weaken": "felt their sword arm get sore",
+}
+
+TEMPLATES = {
+    TEXT: "{0}",
+    ROUND_START: "--- Round {0} ---",
+    ROUND_END: "--- End of Round ---",
+    DAZED_SKIP: "{0} is dazed and cannot move!",
+    SWITCH: "{0} recalls {1} and sends out {2}!",
+    SENDS_OUT: "{0} sends out {1}!",
+    CHARGE_START: "Power gathers around {0}!",
+    VANISH: "{0} vanished into the shadows!",
+    CHARGE_RELEASE: "{0}'s sword gleams with power!",
+    REAPPEAR: "{0} reappeared!",
+    CURSE_DAMAGE: "{0} feels shadows claw at their mind!",
+    MOVE_FAILED: "{0} attempted {1}... but it failed!",
+    PROTECT_FAILED: "{0} uses {1}... but it failed!",
+    PARRY_STANCE: "{0} takes a stance, ready to parry!",
+    AEGIS_RAISED: "{0} raises its shield!",
+    SHIELD_WALL: "{0} creates a protective wall for the team!",
+    SYNERGY: "{0} and {1} resonate with synergy!",
+    MISS: "{0}'s {1} missed!",
+    MISS_INVISIBLE: "{0}'s attack missed {1}!",
+    SHIELD_WALL_BLOCK: "The attack on {0} was blocked by a Shield Wall!",
+    PARRIED: "{0}'s attack hit {1}... but struck their guard!",
+    MOVE_DISABLED: "{0}'s {1} is disabled!",
+    AEGIS_BLOCK: "{0}'s attack was blocked by {1}'s Royal Aegis!",
+    MOVE_USED: "{0} uses {1} on {2}!",
+    DAMAGE: "It dealt {0} damage to {1}!",
+    FAILED: "...but it failed!",
+    HEAL: "{0} was blessed with heavenly light and recovered health!",
+    SOUL_ABLAZE: "{0} was burned by {1}'s Soul Ablaze!",
+    WEATHER_SET: "The weather changed to {0}!",
+    SYNERGY_EFFECT: lambda name, effect: (
+        f"{name} is now affected by {effect.replace('_', ' ')}!"
+    ),
+    FAINTED: "{0} has fainted!",
+    TEAM_DEFEATED: "{0} has no more knights!",
+    WEATHER_END: "The {0} subsided.",
+    WEATHER_CONTINUES: "The {0} continues...",
+    BURN_DAMAGE: "{0} was hurt by its burn!",
+    DAZE_CLEARED: "{0} shook off the daze!",
+    EVADE: "{0} avoided the attack with Eye of the Storm!",
+    GUARD_REDUCED: "{0}'s Guard reduced the damage by {1}!",
+    GUARD_BROKEN: "{0}'s Guard was broken!",
+    ICE_SHIELD: "{0}'s Ice Shield created {1} Guard!",
+    RECOIL: "{0} took {1} in recoil damage!",
+    STAT_UP: "{0}'s {1} rose!",
+    STAT_DOWN: "{0}'s {1} fell!",
+    STATUS_APPLIED: lambda name, status: (
+        f"{name} {STATUS_MESSAGES.get(status, status)}."
+    ),
+    STATUS_ALREADY: "{0} is already {1}",
+    STATUS_BLOCKED: "{0}'s Grounded ability prevents it from being slowed!",
+    STATUS_ENDED: "{0} is no longer {1}.",
+    EFFECT_ENDED: lambda name, effect: f"{name}'s {effect.replace('_', ' ')} wore off.",
+    MOVE_ENABLED: "{0} can use {1} again.",
+}
+
+
+def render(code, args):
+    """Turn a recorded event back into the line of text players see."""
+    template = TEMPLATES[code]
+    if callable(template):
+        return template(*args)
+    return template.format(*args)
+
+
+class BattleLog:
+    """Collects battle events for any attached sinks."""
+
+    def __init__(self):
+        self.events = []
+        self.sinks = []
+
+    def attach(self, sink):
+        self.sinks.append(sink)
+        return sink
+
+    def detach(self, sink):
+        self.sinks.remove(sink)
+
+    def emit(self, code, *args):
+        if self.sinks:
+            self.events.append((code, args))
+
+    def append(self, text):
+        """Record a free-form line of text."""
+        if self.sinks:
+            self.events.append((TEXT, (text,)))
+
+    def flush(self):
+        """Render pending events into every attached sink."""
+        if not self.events:
+            return
+        events, self.events = self.events, []
+        for sink in self.sinks:
+            sink.write_events(events)
+
+    def __iter__(self):
+        return (render(code, args) for code, args in self.events)
+
+    def __len__(self):
+        return len(self.events)
+
+
+class FileSink:
+    """Writes each rendered event as a line of text to a file or stream."""
+
+    def __init__(self, file=None):
+        self.file = file if file is not None else sys.stdout
+
+    def write_events(self, events):
+        for code, args in events:
+            self.file.write(render(code, args) + "\n")
+
+
+class ListSink:
+    """Keeps the raw events, e.g. for replays or analysis."""
+
+    def __init__(self):
+        self.events = []
+
+    def write_events(self, events):
+        self.events.extend(events)
+
+    def lines(self):
+        return [render(code, args) for code, args in self.events]
+
+
+# Shared by knights that are not in a battle; it has no sinks so emits are dropped.
+NULL_LOG = BattleLog()
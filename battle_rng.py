@@ -0,0 +1,62 @@
+import random
+
+# --- Battle Random Streams ---
+#
+# Every Battle draws from its own random.Random, seeded from a recorded seed,
+# so a result can be replayed exactly and battles in different threads or
+# processes never share hidden state.
+
+
+def new_rng(seed=None):
+    """Return (seed, rng). Without a seed one is drawn from the global RNG,
+    so seeding the random module still makes a whole run reproducible."""
+    if seed is None:
+        seed = random.getrandbits(64)
+    return seed, random.Random(seed)
+
+
+class SeedStream:
+    """Hands out per-battle seeds derived from one master seed.
+
+    Seeds are drawn from the master RNG a block at a time. Give each worker
+    or each candidate the same master seed to replay the same battles, e.g.
+    for common-random-number comparisons between brains."""
+
+    def __init__(self, master_seed=None, block_size=1024):
+        self.master_seed, self._master = new_rng(master_seed)
+        self.block_size = block_size
+        self._block = []
+        self._pos = 0
+
+    def _refill(self):
+        bits = self._master.getrandbits
+        self._block = [bits(64) for _ in range(self.block_size)]
+        self._pos = 0
+
+    def next_seed(self):
+        if self._pos >= len(self._block):
+            self._refill()
+        seed = self._block[self._pos]
+        self._pos += 1
+        return seed
+
+    def take(self, count):
+        return [self.next_seed() for _ in range(count)]
+
+    def __iter__(self):
+        while True:
+            yield self.next_seed()
+
+
+class AntitheticRandom(random.Random):
+    """The mirror image of random.Random(seed): each random() is 1 - u for
+    the u the plain stream would give, and each integer draw (choice,
+    randrange, shuffle) is n - 1 - k for its k. A battle replayed on the
+    mirrored stream is negatively correlated with the original, which
+    lowers the variance of their average."""
+
+    def random(self):
+        return 1.0 - super().random()
+
+    def _randbelow(self, n):
+        return n - 1 - super()._randbelow(n)
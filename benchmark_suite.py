@@ -0,0 +1,553 @@
+import argparse
+import copy
+import gc
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+# Add the script's directory to the Python path
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(script_dir)
+
+from gamedata import ALL_MOVES
+from headless_battle import HeadlessBattle
+from knight_battle_game import Knight, Player, Warband
+from knight_ai_training import AIBrain, MOVE_NAMES, RandomPolicy
+
+# --- Benchmark Suite ---
+#
+# End-to-end battle throughput on the bundled warbands plus micro-timings of
+# the engine and AI hot paths. Each benchmark is a setup function returning
+# a no-argument callable; it is run in batches sized to take a few
+# milliseconds, and both the fastest and the median batch are kept. Results
+# can be saved as a JSON baseline and later runs compared against it: the
+# medians are compared, measured with the baseline's own repeat and batch
+# time, and anything slower than the threshold is flagged. Checks are correctness checks of the
+# same code paths, run with --check; a fast path that drifts from the slow
+# one it replaces should fail here rather than in a training run.
+
+TEAM_FILES = ("co.json", "cs.json", "ss.json", "ug.json", "ai_opponent_team.json")
+BASELINE_FILE = os.path.join(script_dir, "benchmark_baseline.json")
+# Slower than the baseline by more than this fails. Medians of unchanged
+# code commonly drift by up to 25% between runs, so the default only flags
+# slowdowns beyond that; a busy or shared host can drift far more, so re-run
+# before trusting a flag. Baselines are per machine and are not committed:
+# save one with --save before changing the code, then --compare.
+REGRESSION_THRESHOLD = 0.30
+DEFAULT_REPEAT = 5
+DEFAULT_BATCH_TIME = 0.05
+HEADLESS_SEEDS = 5  # Battles per opponent in each end-to-end call
+BENCHMARKS = {}
+CHECKS = {}
+
+
+def benchmark(name):
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+
+    return register
+
+
+def check(name):
+    def register(function):
+        CHECKS[name] = function
+        return function
+
+    return register
+
+
+def load_warbands():
+    return {
+        os.path.splitext(path)[0]: Warband.from_file(os.path.join(script_dir, path))
+        for path in TEAM_FILES
+    }
+
+
+def new_battle(warband1, warband2, seed=1):
+    """A headless battle between two random players, knights sent out."""
+    p1 = Player("P1", warband1.knights())
+    p1.ai_logic = RandomPolicy()
+    p2 = Player("P2", warband2.knights())
+    p2.ai_logic = RandomPolicy()
+    battle = HeadlessBattle(p1, p2, seed=seed)
+    battle.initial_setup()
+    return battle
+
+
+# --- End to End ---
+def _headless(team):
+    def setup():
+        warbands = load_warbands()
+        opponents = [warbands[name] for name in warbands if name != team]
+        seeds = range(1, HEADLESS_SEEDS + 1)
+
+        # Each call replays the same battles against each other bundled
+        # warband, so every batch does identical work
+        def run():
+            for opponent in opponents:
+                for seed in seeds:
+                    p1 = Player("P1", warbands[team].knights())
+                    p1.ai_logic = RandomPolicy()
+                    p2 = Player("P2", opponent.knights())
+                    p2.ai_logic = RandomPolicy()
+                    HeadlessBattle(p1, p2, seed=seed).run_simulation()
+
+        return run, len(opponents) * len(seeds)
+
+    return setup
+
+
+for _team in TEAM_FILES:
+    _name = os.path.splitext(_team)[0]
+    benchmark(f"headless.run_simulation[{_name}]")(_headless(_name))
+
+
+# --- Engine ---
+@benchmark("Knight.__init__")
+def bench_knight_init():
+    with open(os.path.join(script_dir, "co.json")) as f:
+        data = json.load(f)[0]
+    return lambda: Knight(data), 1
+
+
+@benchmark("Knight.take_damage")
+def bench_take_damage():
+    knight = load_warbands()["co"].knights()[0]
+
+    def run():
+        knight.hp = knight.max_hp
+        knight.take_damage(10)
+
+    return run, 1
+
+
+@benchmark("Knight.attack+speed (cached)")
+def bench_stats_cached():
+    knight = load_warbands()["co"].knights()[0]
+    return lambda: (knight.attack, knight.speed), 1
+
+
+@benchmark("Knight.attack+speed (recomputed)")
+def bench_stats_recomputed():
+    knight = load_warbands()["co"].knights()[0]
+
+    def run():
+        knight.invalidate_stats()
+        return knight.attack, knight.speed
+
+    return run, 1
+
+
+@benchmark("Battle.snapshot")
+def bench_snapshot():
+    warbands = load_warbands()
+    battle = new_battle(warbands["co"], warbands["ug"])
+    return battle.snapshot, 1
+
+
+@benchmark("Battle.restore")
+def bench_restore():
+    warbands = load_warbands()
+    battle = new_battle(warbands["co"], warbands["ug"])
+    state = battle.snapshot()
+    return lambda: battle.restore(state), 1
+
+
+@benchmark("copy.deepcopy(Battle)")
+def bench_deepcopy():
+    """What snapshot() and restore() replace: copying the whole battle."""
+    warbands = load_warbands()
+    battle = new_battle(warbands["co"], warbands["ug"])
+    return lambda: copy.deepcopy(battle), 1
+
+
+@benchmark("Battle.apply_move_effect (+restore)")
+def bench_apply_move_effect():
+    """Every move of the attacker in turn, restoring the battle after each;
+    subtract Battle.restore for the move alone."""
+    warbands = load_warbands()
+    battle = new_battle(warbands["co"], warbands["ug"])
+    attacker = battle.p1.active_knights[0]
+    target = battle.p2.active_knights[0]
+    state = battle.snapshot()
+    moves = attacker.moves
+
+    def run():
+        for move in moves:
+            battle.apply_move_effect(attacker, move, target)
+            battle.restore(state)
+
+    return run, len(moves)
+
+
+class _UncachedKnight(Knight):
+    """A Knight that recomputes its effective stats on every read, as before
+    they were cached."""
+
+    attack = property(lambda self: self._compute_stats()[0])
+    defense = property(lambda self: self._compute_stats()[1])
+    speed = property(lambda self: self._compute_stats()[2])
+
+
+def _round(cached):
+    def setup():
+        """One round of a battle two rounds in, restoring it after each;
+        subtract Battle.restore for the round alone."""
+        warbands = load_warbands()
+        battle = new_battle(warbands["co"], warbands["ug"], seed=2)
+        battle.play_round()
+        battle.play_round()
+        if not cached:
+            for knight in battle.p1.team + battle.p2.team:
+                knight.__class__ = _UncachedKnight
+        state = battle.snapshot()
+
+        def run():
+            battle.play_round()
+            battle.restore(state)
+
+        return run, 1
+
+    return setup
+
+
+benchmark("Battle round, stats cached (+restore)")(_round(cached=True))
+benchmark("Battle round, stats uncached (+restore)")(_round(cached=False))
+
+
+# --- AI ---
+@benchmark("AIBrain.get_state_key")
+def bench_state_key():
+    warbands = load_warbands()
+    battle = new_battle(warbands["co"], warbands["ug"])
+    brain = AIBrain()
+    return lambda: brain.get_state_key(battle.p1, battle.p2, battle), 1
+
+
+@benchmark("AIBrain.get_best_move")
+def bench_best_move():
+    warbands = load_warbands()
+    battle = new_battle(warbands["co"], warbands["ug"])
+    brain = AIBrain(os.path.join(script_dir, "ai_brain.json"), frozen=True)
+    knight = battle.p1.active_knights[0]
+    return lambda: brain.get_best_move(battle, battle.p1, battle.p2, knight), 1
+
+
+def _population_brains(states=2000, count=5):
+    import train_ai
+
+    rng = random.Random(1)
+    keys = [rng.getrandbits(64) for _ in range(states * 2)]
+    brains = []
+    for _ in range(count):
+        brain = train_ai.new_brain()
+        brain.knowledge = {
+            key: rng.choice(MOVE_NAMES) for key in rng.sample(keys, states)
+        }
+        brain.visits = dict.fromkeys(brain.knowledge, 2)
+        brains.append(brain)
+    return train_ai, brains
+
+
+@benchmark("train_ai.crossover (2k states)")
+def bench_crossover():
+    train_ai, brains = _population_brains()
+    random.seed(1)
+    return lambda: train_ai.crossover(brains[0], brains[1]), 1
+
+
+@benchmark("train_ai.mutate (2k states)")
+def bench_mutate():
+    train_ai, brains = _population_brains()
+    all_moves = list(ALL_MOVES)
+    random.seed(1)
+    return lambda: train_ai.mutate(brains[0], all_moves), 1
+
+
+@benchmark("BrainPopulation.evolve (2k states, per child)")
+def bench_evolve():
+    """The columnar generation step that replaces crossover() and mutate()
+    when COLUMNAR_POPULATION is on, timed per child it produces."""
+    import numpy as np
+    import train_ai
+    from brain_population import BrainPopulation
+
+    _, brains = _population_brains(count=train_ai.POPULATION_SIZE)
+    population = BrainPopulation(
+        len(brains), lambda: train_ai.new_brain(track_legal=True)
+    )
+    population.absorb(brains)
+    rng = np.random.default_rng(1)
+    population.legal[: population.width] = (
+        rng.random((population.width, population.legal.shape[1])) < 0.05
+    )
+    population.fitness[:] = rng.integers(0, 2000, population.size)
+    # evolve() replaces the arrays rather than writing into them, so putting
+    # the old ones back starts every call from the same generation
+    start = dict(population.__dict__)
+
+    elites = 2
+
+    def run():
+        population.__dict__.update(start)
+        population.evolve(rng, elites=elites)
+
+    return run, population.size - elites
+
+
+# --- Checks ---
+@check("Battle.restore replays identically")
+def check_restore_replay(rounds=3, seeds=10):
+    """Snapshot each bundled matchup a few rounds in, play it out, restore
+    the snapshot and play it out again: both runs must end the same."""
+    warbands = load_warbands()
+    for name1, name2 in zip(warbands, list(warbands)[1:] + list(warbands)[:1]):
+        for seed in range(1, seeds + 1):
+            battle = new_battle(warbands[name1], warbands[name2], seed)
+            if not all(battle.play_round() for _ in range(rounds)):
+                continue
+            state = battle.snapshot()
+            first = battle.play_out(rounds + 1), battle.snapshot()
+            battle.restore(state)
+            second = battle.play_out(rounds + 1), battle.snapshot()
+            if first != second:
+                raise AssertionError(
+                    f"{name1} vs {name2}, seed {seed}: the replay diverged"
+                )
+
+
+@check("train_ai warm-starts from ai_brain.json")
+def check_warm_start():
+    """The committed brain seeds a columnar population that keeps all of its
+    knowledge and can play and evolve."""
+    import numpy as np
+    import train_ai
+    from brain_population import BrainPopulation
+
+    train_ai.init_worker(os.path.join(script_dir, "ai_opponent_team.json"))
+    brain_file = os.path.join(script_dir, "ai_brain.json")
+    saved = AIBrain(brain_file)
+    brains = train_ai.warm_start_brains(brain_file, 4, track_legal=True)
+    population = BrainPopulation(
+        4,
+        lambda: train_ai.new_brain(track_legal=True, levels=brains[0].levels),
+    )
+    population.absorb(brains)
+    for brain in population.brains():
+        if brain.knowledge != dict(saved.knowledge.items()):
+            raise AssertionError("a warm-started brain lost saved knowledge")
+    learners = population.brains()
+    for i, brain in enumerate(learners):
+        train_ai.play_match((brain, learners[0], i + 1, 1))
+    population.absorb(learners)
+    population.evolve(np.random.default_rng(1))
+
+
+def run_checks(report=print):
+    """Run every check; returns the names of those that failed."""
+    failed = []
+    for name, function in CHECKS.items():
+        try:
+            function()
+        except Exception as e:
+            failed.append(name)
+            report(f"{name:<44} FAILED: {e}")
+        else:
+            report(f"{name:<44} ok")
+    return failed
+
+
+# --- Running ---
+def _time_batch(run, number):
+    start = time.perf_counter()
+    for _ in range(number):
+        run()
+    return time.perf_counter() - start
+
+
+def measure(run, repeat=DEFAULT_REPEAT, batch_time=DEFAULT_BATCH_TIME):
+    """Seconds per call: the fastest of `repeat` batches, each sized to take
+    about batch_time seconds."""
+    number = 1
+    while True:
+        elapsed = _time_batch(run, number)
+        if elapsed >= batch_time / 5:
+            break
+        number *= 10
+    number = max(1, int(number * batch_time / elapsed))
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        batches = [_time_batch(run, number) / number for _ in range(repeat)]
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return min(batches), sorted(batches)[len(batches) // 2]
+
+
+def run_suite(
+    selected=None, repeat=DEFAULT_REPEAT, batch_time=DEFAULT_BATCH_TIME, report=print
+):
+    results = {}
+    for name, setup in BENCHMARKS.items():
+        if selected and not any(s in name for s in selected):
+            continue
+        run, ops = setup()
+        best, median = measure(run, repeat, batch_time)
+        results[name] = {
+            "seconds_per_op": best / ops,
+            "median_seconds_per_op": median / ops,
+            "ops_per_sec": ops / best,
+        }
+        report(format_result(name, results[name]))
+    return results
+
+
+def format_result(name, result):
+    seconds = result["seconds_per_op"]
+    if seconds >= 1e-3:
+        per_op = f"{seconds * 1e3:9.3f} ms"
+    else:
+        per_op = f"{seconds * 1e6:9.3f} µs"
+    return f"{name:<44} {per_op}  {result['ops_per_sec']:>12,.0f}/s"
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def compare(baseline, results, threshold=REGRESSION_THRESHOLD):
+    """(name, old seconds, new seconds, ratio, verdict) for benchmarks in
+    both, from median seconds per op; verdict is "regression", "improved" or
+    "ok"."""
+    rows = []
+    for name, result in results.items():
+        old = baseline["results"].get(name)
+        if old is None:
+            continue
+        old_seconds = old["median_seconds_per_op"]
+        new_seconds = result["median_seconds_per_op"]
+        ratio = new_seconds / old_seconds
+        verdict = "ok"
+        if ratio > 1 + threshold:
+            verdict = "regression"
+        elif ratio < 1 - threshold:
+            verdict = "improved"
+        rows.append((name, old_seconds, new_seconds, ratio, verdict))
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark the battle engine and AI, optionally against a baseline."
+    )
+    parser.add_argument(
+        "-k",
+        "--select",
+        action="append",
+        metavar="TEXT",
+        help="only run benchmarks whose name contains TEXT (repeatable)",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        help=f"batches per benchmark (default {DEFAULT_REPEAT}, "
+        "or the baseline's with --compare)",
+    )
+    parser.add_argument(
+        "--batch-time",
+        type=float,
+        metavar="SECONDS",
+        help=f"seconds per batch (default {DEFAULT_BATCH_TIME}, "
+        "or the baseline's with --compare)",
+    )
+    parser.add_argument(
+        "--save",
+        nargs="?",
+        const=BASELINE_FILE,
+        metavar="PATH",
+        help=f"write the results as a baseline (default {os.path.basename(BASELINE_FILE)})",
+    )
+    parser.add_argument(
+        "--compare",
+        nargs="?",
+        const=BASELINE_FILE,
+        metavar="PATH",
+        help="compare against a saved baseline; exits 1 on a regression",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=REGRESSION_THRESHOLD,
+        help="relative slowdown that counts as a regression",
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="run the correctness checks first; exits 1 if one fails",
+    )
+    args = parser.parse_args()
+
+    if args.check:
+        if run_checks():
+            sys.exit(1)
+        print()
+
+    settings = {"repeat": DEFAULT_REPEAT, "batch_time": DEFAULT_BATCH_TIME}
+    if args.compare:
+        if not os.path.exists(args.compare):
+            sys.exit(
+                f"No baseline at {args.compare}; save one on this machine with --save"
+            )
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        machine = {
+            key: value
+            for key, value in environment().items()
+            if key != "time" and baseline["environment"].get(key) != value
+        }
+        if machine:
+            print(f"Note: the baseline was saved on another setup ({machine})\n")
+        # Measure the same way the baseline was measured
+        settings.update(baseline.get("settings", {}))
+    if args.repeat is not None:
+        settings["repeat"] = args.repeat
+    if args.batch_time is not None:
+        settings["batch_time"] = args.batch_time
+
+    results = run_suite(args.select, settings["repeat"], settings["batch_time"])
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(
+                {
+                    "environment": environment(),
+                    "settings": settings,
+                    "results": results,
+                },
+                f,
+                indent=4,
+            )
+        print(f"\nSaved baseline to {args.save}")
+
+    if args.compare:
+        rows = compare(baseline, results, args.threshold)
+        print(f"\nCompared with {args.compare} (threshold {args.threshold:.0%}):")
+        for name, old, new, ratio, verdict in rows:
+            flag = {"regression": "  <-- REGRESSION", "improved": "  improved"}.get(
+                verdict, ""
+            )
+            print(f"{name:<44} {ratio:6.2f}x time{flag}")
+        if any(row[4] == "regression" for row in rows):
+            sys.exit(1)
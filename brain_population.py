@@ -0,0 +1,209 @@
+import os
+import sys
+from contextlib import nullcontext
+from itertools import islice
+
+import numpy as np
+
+# Add the script's directory to the Python path
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(script_dir)
+
+from knight_ai_training import MOVE_IDS, MOVE_NAMES
+
+# --- Columnar Population ---
+#
+# Every brain in a BrainPopulation shares one index of state keys. Its genes
+# are a row of a (brains x states) matrix of move ids, with -1 for a state
+# the brain does not know. Crossover and mutation then run as array
+# operations over the whole population at once. Brains still play battles
+# as ordinary AIBrains: brains() hands out dict-backed brains built from the
+# rows, and absorb() writes back what they learned.
+
+NO_GENE = -1
+MOVE_NAME_ARRAY = np.array(MOVE_NAMES, dtype=object)
+
+
+def _untimed(phase_name):
+    return nullcontext()
+
+
+class BrainPopulation:
+    """A population of AIBrains stored as gene rows over a shared state index."""
+
+    def __init__(self, size, brain_factory, capacity=1024):
+        self.size = size
+        self.brain_factory = (
+            brain_factory  # Makes an empty AIBrain with the settings to use
+        )
+        self.keys = {}  # state key -> column
+        self.key_list = []  # column -> state key
+        self.genes = np.full((size, capacity), NO_GENE, dtype=np.int16)
+        self.visits = np.zeros((size, capacity), dtype=np.int32)
+        # legal[column, move id]: some knight that learned the state knows the move
+        self.legal = np.zeros((capacity, len(MOVE_NAMES)), dtype=bool)
+        self.fitness = np.zeros(size, dtype=np.int64)
+        self.exploration = [None] * size
+        self._columns = [np.empty(0, dtype=np.int64)] * size
+
+    def __getstate__(self):
+        # The factory is code, not data; set it again after unpickling
+        state = self.__dict__.copy()
+        state["brain_factory"] = None
+        return state
+
+    @property
+    def width(self):
+        return len(self.key_list)
+
+    # --- State Index ---
+    def intern(self, state_key):
+        column = self.keys.get(state_key)
+        if column is None:
+            column = self.keys[state_key] = len(self.key_list)
+            self.key_list.append(state_key)
+            if column >= self.genes.shape[1]:
+                self._grow()
+        return column
+
+    def _grow(self):
+        capacity = self.genes.shape[1] * 2
+        genes = np.full((self.size, capacity), NO_GENE, dtype=np.int16)
+        genes[:, : self.genes.shape[1]] = self.genes
+        visits = np.zeros((self.size, capacity), dtype=np.int32)
+        visits[:, : self.visits.shape[1]] = self.visits
+        legal = np.zeros((capacity, len(MOVE_NAMES)), dtype=bool)
+        legal[: self.legal.shape[0]] = self.legal
+        self.genes, self.visits, self.legal = genes, visits, legal
+
+    # --- Brains In, Brains Out ---
+    def brain(self, i, key_array=None):
+        """Row i as a dict-backed AIBrain that can play battles."""
+        if key_array is None:
+            key_array = np.array(self.key_list, dtype=object)
+        brain = self.brain_factory()
+        columns = np.flatnonzero(self.genes[i, : self.width] != NO_GENE)
+        keys = key_array[columns].tolist()
+        moves = MOVE_NAME_ARRAY[self.genes[i, columns]].tolist()
+        brain.knowledge = dict(zip(keys, moves))
+        if brain.visits is not None:
+            brain.visits = dict(zip(keys, self.visits[i, columns].tolist()))
+        if self.exploration[i] is not None:
+            brain.exploration = self.exploration[i]
+        brain.fitness = int(self.fitness[i])
+        self._columns[i] = columns
+        return brain
+
+    def brains(self):
+        key_array = np.array(self.key_list, dtype=object)
+        return [self.brain(i, key_array) for i in range(self.size)]
+
+    def best_brain(self):
+        return self.brain(int(np.argmax(self.fitness)))
+
+    def absorb(self, brains):
+        """Write back brains handed out by brains(), after they have played.
+        Learning only ever adds states, so only entries past the ones each
+        brain started with are new."""
+        for i, brain in enumerate(brains):
+            columns = self._columns[i]
+            start = len(columns)
+            new_items = list(islice(brain.knowledge.items(), start, None))
+            new_columns = [self.intern(key) for key, _ in new_items]
+            if new_columns:
+                self.genes[i, new_columns] = [MOVE_IDS[name] for _, name in new_items]
+                columns = np.concatenate((columns, new_columns))
+            if brain.visits is not None:
+                self.visits[i, columns] = np.fromiter(
+                    brain.visits.values(), dtype=np.int32, count=len(columns)
+                )
+            if brain.legal_moves:
+                for key, move_ids in brain.legal_moves.items():
+                    self.legal[self.keys[key], list(move_ids)] = True
+                brain.legal_moves.clear()
+            self.exploration[i] = brain.exploration
+            self.fitness[i] = brain.fitness
+
+    # --- Evolution ---
+    def evolve(self, rng, elites=2, parents=5, mutation_rate=0.1, phase=_untimed):
+        """Keep the fittest `elites` rows and fill the rest with children of
+        the fittest `parents`: uniform crossover of gene rows, then, for a
+        mutation_rate share of children, one known state gets a new move the
+        state's knight can use. phase(name) is a context manager timing
+        each step, e.g. TrainingTelemetry.phase."""
+        width = self.width
+        with phase("selection"):
+            order = np.argsort(-self.fitness, kind="stable")
+            keep, top = order[:elites], order[:parents]
+            count = self.size - elites
+            parent1 = top[rng.integers(0, len(top), count)]
+            parent2 = top[rng.integers(0, len(top), count)]
+
+        with phase("crossover"):
+            genes1 = self.genes[parent1, :width]
+            genes2 = self.genes[parent2, :width]
+            pick = rng.random((count, width)) < 0.5
+            children = np.where(pick, genes1, genes2)
+            visits = np.where(
+                children != NO_GENE,
+                np.maximum(self.visits[parent1, :width], self.visits[parent2, :width]),
+                0,
+            )
+        with phase("mutation"):
+            self._mutate(children, rng, mutation_rate)
+
+        with phase("bookkeeping"):
+            genes = np.full_like(self.genes, NO_GENE)
+            genes[:elites] = self.genes[keep]
+            genes[elites:, :width] = children
+            all_visits = np.zeros_like(self.visits)
+            all_visits[:elites] = self.visits[keep]
+            all_visits[elites:, :width] = visits
+            self.genes, self.visits = genes, all_visits
+
+            fitness = np.zeros_like(self.fitness)
+            fitness[:elites] = self.fitness[keep]
+            self.fitness = fitness
+            self.exploration = [self.exploration[i] for i in keep] + [
+                self.exploration[i].copy() if self.exploration[i] is not None else None
+                for i in parent1
+            ]
+            self._drop_dead_columns()
+
+    def _mutate(self, children, rng, mutation_rate):
+        mutants = np.flatnonzero(rng.random(len(children)) < mutation_rate)
+        if len(mutants) == 0 or children.shape[1] == 0:
+            return
+        known = children[mutants] != NO_GENE
+        # A uniformly random known state per mutant
+        scores = np.where(known, rng.random(known.shape), -1.0)
+        columns = scores.argmax(axis=1)
+        has_genes = known.any(axis=1)
+        mutants, columns = mutants[has_genes], columns[has_genes]
+
+        legal = self.legal[columns]
+        counts = legal.sum(axis=1)
+        usable = counts > 0
+        mutants, columns, legal = mutants[usable], columns[usable], legal[usable]
+        # The k-th legal move, k uniform over the legal count
+        k = (rng.random(len(mutants)) * counts[usable]).astype(np.int64)
+        moves = (legal.cumsum(axis=1) > k[:, None]).argmax(axis=1)
+        children[mutants, columns] = moves
+
+    def _drop_dead_columns(self):
+        """Forget states no brain knows any more, once they are half the index."""
+        width = self.width
+        alive = (self.genes[:, :width] != NO_GENE).any(axis=0)
+        if alive.sum() * 2 > width:
+            return
+        columns = np.flatnonzero(alive)
+        self.key_list = [self.key_list[c] for c in columns]
+        self.keys = {key: i for i, key in enumerate(self.key_list)}
+        capacity = self.genes.shape[1]
+        genes = np.full_like(self.genes, NO_GENE)
+        genes[:, : len(columns)] = self.genes[:, columns]
+        visits = np.zeros_like(self.visits)
+        visits[:, : len(columns)] = self.visits[:, columns]
+        legal = np.zeros((capacity, len(MOVE_NAMES)), dtype=bool)
+        legal[: len(columns)] = self.legal[columns]
+        self.genes, self.visits, self.legal = genes, visits, legal
@@ -1,74 +1,145 @@
-import copy
+from dataclasses import dataclass, field
+from types import MappingProxyType
+
+# --- Effect Compilation ---
+#
+# Effect strings such as "attack_up_1_defense_up_1" or "recoil_33" are parsed
+# once, when the master lists below are built, into Effect records that the
+# battle engine executes directly. A malformed string fails the import.
+
+STATUS_EFFECTS = ("burned", "slowed", "cursed", "dazed", "vulnerable", "weaken")
+SELF_STATUS_EFFECTS = ("slowed", "weaken", "vulnerable", "dazed")
+SYNERGY_EFFECTS = ("consecration", "eye_of_the_storm", "invisible", "mists_of_borealis")
+INERT_EFFECTS = ("taunt",)  # Recognised by the data but not yet used by the engine
+STAT_KEYS = {"attack": "atk", "defense": "def", "speed": "spd"}
+
+EFFECT_NONE = 0
+EFFECT_STATUS = 1
+EFFECT_STAGES = 2
+EFFECT_RECOIL = 3
+
+
+@dataclass(frozen=True, slots=True)
+class Effect:
+    """A parsed move effect: a status, a set of stage changes or recoil."""
+
+    kind: int
+    status: str = None
+    stages: tuple = ()  # (stat_key, display_name, delta) triples
+    recoil_percent: int = 0
+
+
+def _compile_stages(text):
+    parts = text.split("_")
+    if len(parts) % 3 != 0:
+        raise ValueError(f"Malformed stat effect '{text}'")
+    stages = []
+    for i in range(0, len(parts), 3):
+        stat_name, direction, amount = parts[i : i + 3]
+        if stat_name not in STAT_KEYS or direction not in ("up", "down"):
+            raise ValueError(f"Malformed stat effect '{text}'")
+        if not amount.isdigit():
+            raise ValueError(f"Malformed stat amount in '{text}'")
+        delta = int(amount) if direction == "up" else -int(amount)
+        stages.append((STAT_KEYS[stat_name], stat_name.capitalize(), delta))
+    return Effect(EFFECT_STAGES, stages=tuple(stages))
+
+
+def compile_effect(text, self_effect=False):
+    """Compile a move's effect or self_effect string into an Effect."""
+    if text is None:
+        return None
+    statuses = SELF_STATUS_EFFECTS if self_effect else STATUS_EFFECTS
+    if text in statuses:
+        return Effect(EFFECT_STATUS, status=text)
+    if text in INERT_EFFECTS:
+        return Effect(EFFECT_NONE)
+    if text.startswith("recoil_"):
+        percent = text[len("recoil_") :]
+        if not percent.isdigit():
+            raise ValueError(f"Malformed recoil effect '{text}'")
+        return Effect(EFFECT_RECOIL, recoil_percent=int(percent))
+    return _compile_stages(text)
+
 
 # --- Core Class Definitions ---
+#
+# Game records are immutable and slotted so every Knight can share the same
+# instances from the master lists below instead of copying them.
 
 
+@dataclass(frozen=True, slots=True, eq=False, repr=False)
 class Move:
     """Represents a move a Knight can perform."""
 
-    def __init__(
-        self,
-        name,
-        faction,
-        power,
-        accuracy=100,
-        target_type="single_enemy",
-        effect=None,
-        effect_chance=0,
-        effect_duration=3,
-        self_effect=None,
-        synergy_effect=None,
-        guard_gain=0,
-        guard_multiplier=1.0,
-        charge_turns=0,
-        rampage_turns=0,
-        blocks_aoe=False,
-        sets_weather=None,
-        priority=0,
-        is_protection_move=False,
-        description="",
-    ):
-        self.name = name
-        self.faction = faction
-        self.power = power
-        self.accuracy = accuracy
-        self.target_type = target_type
-        self.effect = effect
-        self.effect_chance = effect_chance
-        self.effect_duration = effect_duration
-        self.self_effect = self_effect
-        self.synergy_effect = synergy_effect
-        self.guard_gain = guard_gain
-        self.guard_multiplier = guard_multiplier
-        self.charge_turns = charge_turns
-        self.rampage_turns = rampage_turns
-        self.blocks_aoe = blocks_aoe
-        self.sets_weather = sets_weather
-        self.priority = priority
-        self.is_protection_move = is_protection_move
-        self.description = description
+    name: str
+    faction: str
+    power: int
+    accuracy: int = 100
+    target_type: str = "single_enemy"
+    effect: str = None
+    effect_chance: int = 0
+    effect_duration: int = 3
+    self_effect: str = None
+    synergy_effect: str = None
+    guard_gain: int = 0
+    guard_multiplier: float = 1.0
+    charge_turns: int = 0
+    rampage_turns: int = 0
+    blocks_aoe: bool = False
+    sets_weather: str = None
+    priority: int = 0
+    is_protection_move: bool = False
+    description: str = ""
+    effect_op: Effect = field(init=False, default=None)
+    self_effect_op: Effect = field(init=False, default=None)
+
+    def __post_init__(self):
+        if not isinstance(self.effect_duration, int):
+            raise ValueError(f"{self.name}: effect_duration must be an int")
+        if self.synergy_effect and self.synergy_effect not in SYNERGY_EFFECTS:
+            raise ValueError(
+                f"{self.name}: unknown synergy effect '{self.synergy_effect}'"
+            )
+        try:
+            effect_op = compile_effect(self.effect)
+            self_effect_op = compile_effect(self.self_effect, self_effect=True)
+        except ValueError as e:
+            raise ValueError(f"{self.name}: {e}") from None
+        object.__setattr__(self, "effect_op", effect_op)
+        object.__setattr__(self, "self_effect_op", self_effect_op)
 
     def __repr__(self):
         return f"{self.name} ({self.faction})"
 
 
+@dataclass(frozen=True, slots=True, eq=False)
 class Ability:
     """Represents a passive or triggered ability."""
 
-    def __init__(self, name, faction, description):
-        self.name = name
-        self.faction = faction
-        self.description = description
+    name: str
+    faction: str
+    description: str
 
 
+@dataclass(frozen=True, slots=True, eq=False, init=False)
 class KnightTemplate:
     """A template for creating Knight instances, defining base stats and learnset."""
 
+    name: str
+    faction: str
+    base_stats: MappingProxyType
+    learnset: tuple
+
     def __init__(self, name, faction, hp, attack, defense, speed, learnset):
-        self.name = name
-        self.faction = faction
-        self.base_stats = {"hp": hp, "atk": attack, "def": defense, "spd": speed}
-        self.learnset = learnset
+        object.__setattr__(self, "name", name)
+        object.__setattr__(self, "faction", faction)
+        object.__setattr__(
+            self,
+            "base_stats",
+            MappingProxyType({"hp": hp, "atk": attack, "def": defense, "spd": speed}),
+        )
+        object.__setattr__(self, "learnset", tuple(learnset))
 
 
 # --- Master Ability List ---
@@ -766,7 +837,7 @@ ALL_MOVES = {
         40,
         90,
         effect="dazed",
-        effect_duration="2",
+        effect_duration=2,
         effect_chance=50,
         description="Drops a large icicle on the target, which may cause it to flinch.",
     ),
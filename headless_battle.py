@@ -8,51 +8,57 @@ script_dir = os.path.dirname(os.path.abspath(__file__))
 parent_dir = os.path.dirname(script_dir)
 sys.path.append(parent_dir)
 
-# Import the main game module and activate silent mode
-import knight_battle_game
-
-knight_battle_game.SILENT_MODE = True
-
 from gamedata import ALL_KNIGHTS, ALL_MOVES, ALL_ABILITIES
-from knight_battle_game import Knight, Player, Battle
+from knight_battle_game import Knight, Player, Battle, DAZED
 
 
 class HeadlessBattle(Battle):
     """A version of the Battle class that runs without user input and logging."""
 
+    silent = True
+
     def display_battlefield(self):
         """Override to do nothing."""
         pass
 
     def run_simulation(self):
         self.initial_setup()
-        round_num = 1
+        return self.play_out()
+
+    def play_out(self, round_num=1):
+        """Play rounds from round_num until a side has no knights left or the
+        round limit is reached, and return the battle log."""
         while (
             self.p1.has_living_knights()
             and self.p2.has_living_knights()
             and round_num < 50
         ):
-            self.prepare_round()
+            if not self.play_round():
+                break
+            round_num += 1
 
-            actions = self.get_all_actions()
-            actions.sort(key=lambda x: (x[1].priority, x[0].speed), reverse=True)
+        self.log.flush()
+        return self.generate_battle_log(round_num)
 
-            for knight, move, targets in actions:
-                if knight.is_fainted:
-                    continue
-                self.execute_action(knight, move, targets)
-                self.process_fainted()
-                if not (self.p1.has_living_knights() and self.p2.has_living_knights()):
-                    break
+    def play_round(self):
+        """Play one round. Returns False if the battle ended during it."""
+        self.prepare_round()
 
-            if not (self.p1.has_living_knights() and self.p2.has_living_knights()):
-                break
+        actions = self.get_all_actions()
+        actions.sort(key=lambda x: (x[1].priority, x[0].speed), reverse=True)
 
-            self.end_of_round_effects()
+        for knight, move, targets in actions:
+            if knight.is_fainted:
+                continue
+            self.execute_action(knight, move, targets)
             self.process_fainted()
-            round_num += 1
+            if not (self.p1.has_living_knights() and self.p2.has_living_knights()):
+                return False
 
-        return self.generate_battle_log(round_num)
+        self.end_of_round_effects()
+        self.process_fainted()
+        self.log.flush()
+        return True
 
     def generate_battle_log(self, turns):
         winner = None
@@ -62,9 +68,10 @@ class HeadlessBattle(Battle):
             winner = self.p2.name
 
         return {
+            "seed": self.seed,
             "winner": winner,
-            "p1_survivors": len([k for k in self.p1.team if not k.is_fainted]),
-            "p2_survivors": len([k for k in self.p2.team if not k.is_fainted]),
+            "p1_survivors": self.p1.living,
+            "p2_survivors": self.p2.living,
             "turns": turns,
         }
 
@@ -78,7 +85,7 @@ class HeadlessBattle(Battle):
         all_knights.sort(key=lambda k: k.speed, reverse=True)
 
         for knight in all_knights:
-            if "dazed" in knight.status_effects:
+            if knight.status_effects.mask & DAZED:
                 continue
 
             if knight.charge_state:
@@ -87,8 +94,8 @@ class HeadlessBattle(Battle):
                 knight.charge_state = None
                 continue
 
-            owner = self.p1 if knight in self.p1.active_knights else self.p2
-            opponent_player = self.p2 if owner == self.p1 else self.p1
+            owner = knight.owner
+            opponent_player = self.p2 if owner is self.p1 else self.p1
 
             move, targets = owner.ai_logic.get_action(
                 self, owner, opponent_player, knight
@@ -98,8 +105,7 @@ class HeadlessBattle(Battle):
             else:
                 benched = owner.get_living_bench()
                 if benched:
-                    slot = owner.active_knights.index(knight)
-                    owner.active_knights[slot] = benched[0]
+                    owner.active_knights[knight.slot] = benched[0]
 
         return actions
 
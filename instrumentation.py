@@ -0,0 +1,280 @@
+import argparse
+import json
+import os
+import sys
+import time
+from collections import Counter
+
+# Add the script's directory to the Python path
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(script_dir)
+
+import battle_log
+
+# --- Battle Instrumentation ---
+#
+# Opt-in timers and rule counters for a Battle. attach() swaps timed
+# wrappers onto one battle instance's hot methods and its players' AI, and
+# listens to the battle's event stream; detach() puts everything back.
+# Nothing in the engine changes, so an uninstrumented battle pays nothing.
+#
+# Timings are inclusive: execute_action contains apply_move_effect and
+# get_all_actions contains the AI decisions. Events are attributed to the
+# innermost timed call that emitted them, so misses land on the move that
+# missed.
+#
+# Abilities are only counted where the engine announces them with an event:
+# Soul Ablaze, Ice Shield and Grounded. Passive modifiers such as Adrenaline,
+# Last Stand or Reinforced change stats or damage silently and are not
+# counted, so the counter is announced_ability_triggers, not a full tally.
+
+PHASES = (
+    "prepare_round",
+    "get_all_actions",
+    "execute_action",
+    "apply_move_effect",
+    "process_fainted",
+    "end_of_round_effects",
+)
+AI_DECISION = "ai_decision"
+
+ANNOUNCED_ABILITY_EVENTS = {
+    battle_log.SOUL_ABLAZE: "Soul Ablaze",
+    battle_log.ICE_SHIELD: "Ice Shield",
+    battle_log.STATUS_BLOCKED: "Grounded",
+}
+MISS_EVENTS = (battle_log.MISS, battle_log.MISS_INVISIBLE)
+
+
+class _TimedPolicy:
+    """Stands in for a Player's ai_logic, timing each decision."""
+
+    def __init__(self, policy, instrumentation):
+        self.policy = policy
+        self.get_action = instrumentation._timed(AI_DECISION, policy.get_action)
+
+    def __getattr__(self, name):
+        return getattr(self.policy, name)
+
+
+class BattleInstrumentation:
+    """Phase timers and counters across every battle attached to it. With
+    trace=True the next battle attached is also recorded as a Chrome trace
+    (chrome://tracing or Perfetto)."""
+
+    def __init__(self, trace=False, clock=time.perf_counter):
+        self.clock = clock
+        self.calls = Counter()
+        self.seconds = Counter()
+        self.move_uses = Counter()
+        self.move_misses = Counter()
+        self.guard_breaks = 0
+        self.announced_ability_triggers = Counter()
+        self.weather_changes = Counter()
+        self.battles = 0
+        self.trace = trace
+        self.trace_events = []
+        self.battle = None
+        self._seen = 0
+        self._epoch = clock()
+
+    # --- Attaching ---
+    def attach(self, battle):
+        """Instrument one battle; call before it runs."""
+        if self.battle is not None:
+            self.detach()
+        self.battle = battle
+        self.battles += 1
+        self._seen = 0
+        self._epoch = self.clock()
+        for name in PHASES:
+            setattr(battle, name, self._timed(name, getattr(battle, name)))
+        for player in (battle.p1, battle.p2):
+            if getattr(player, "ai_logic", None) is not None:
+                player.ai_logic = _TimedPolicy(player.ai_logic, self)
+        battle.log.attach(self)
+        return battle
+
+    def detach(self):
+        battle = self.battle
+        if battle is None:
+            return
+        self._count_events(battle.log.events)
+        battle.log.detach(self)
+        for name in PHASES:
+            del battle.__dict__[name]
+        for player in (battle.p1, battle.p2):
+            if isinstance(getattr(player, "ai_logic", None), _TimedPolicy):
+                player.ai_logic = player.ai_logic.policy
+        self.battle = None
+        # Only the first battle goes into the trace
+        self.trace = False
+
+    # --- Recording ---
+    def _timed(self, name, method):
+        def timed(*args, **kwargs):
+            start = self.clock()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                end = self.clock()
+                self.calls[name] += 1
+                self.seconds[name] += end - start
+                move = self._move_of(name, args)
+                if name == "execute_action":
+                    self.move_uses[move] += 1
+                self._count_events(self.battle.log.events, move)
+                if self.trace:
+                    self._trace_span(name, start, end, args, move)
+
+        return timed
+
+    @staticmethod
+    def _move_of(name, args):
+        if name in ("execute_action", "apply_move_effect") and len(args) > 1:
+            return args[1].name
+        return None
+
+    def _count_events(self, events, move=None):
+        """Count events emitted since the last look, crediting misses to move."""
+        for code, args in events[self._seen :]:
+            if code in MISS_EVENTS:
+                self.move_misses[
+                    move or (args[1] if code == battle_log.MISS else "?")
+                ] += 1
+                self._trace_instant("miss", {"move": move})
+            elif code == battle_log.GUARD_BROKEN:
+                self.guard_breaks += 1
+                self._trace_instant("guard broken", {"knight": args[0]})
+            elif code in ANNOUNCED_ABILITY_EVENTS:
+                ability = ANNOUNCED_ABILITY_EVENTS[code]
+                self.announced_ability_triggers[ability] += 1
+                self._trace_instant(ability, {"knight": args[0]})
+            elif code == battle_log.WEATHER_SET:
+                self.weather_changes[args[0]] += 1
+                self._trace_instant(f"weather: {args[0]}", {})
+            elif code == battle_log.WEATHER_END:
+                self.weather_changes["ended"] += 1
+                self._trace_instant("weather ended", {})
+        self._seen = len(events)
+
+    def write_events(self, events):
+        # The battle log is flushing: count what is left, then start over
+        self._count_events(events)
+        self._seen = 0
+
+    def _timestamp(self, t):
+        return (t - self._epoch) * 1e6  # Trace events use microseconds
+
+    def _trace_span(self, name, start, end, args, move):
+        event = {
+            "name": name,
+            "ph": "X",
+            "ts": self._timestamp(start),
+            "dur": (end - start) * 1e6,
+            "pid": 1,
+            "tid": 1,
+        }
+        if move is not None:
+            event["args"] = {"knight": args[0].name, "move": move}
+        self.trace_events.append(event)
+
+    def _trace_instant(self, name, args):
+        if self.trace:
+            self.trace_events.append(
+                {
+                    "name": name,
+                    "ph": "i",
+                    "s": "t",
+                    "ts": self._timestamp(self.clock()),
+                    "pid": 1,
+                    "tid": 1,
+                    "args": args,
+                }
+            )
+
+    # --- Export ---
+    def summary(self):
+        phases = {
+            name: {
+                "calls": self.calls[name],
+                "total_seconds": self.seconds[name],
+                "mean_us": self.seconds[name] / self.calls[name] * 1e6,
+            }
+            for name in (*PHASES, AI_DECISION)
+            if self.calls[name]
+        }
+        moves = {
+            name: {"uses": uses, "misses": self.move_misses[name]}
+            for name, uses in self.move_uses.most_common()
+        }
+        return {
+            "battles": self.battles,
+            "phases": phases,
+            "moves": moves,
+            "guard_breaks": self.guard_breaks,
+            "announced_ability_triggers": dict(self.announced_ability_triggers),
+            "weather_changes": dict(self.weather_changes),
+        }
+
+    def write_summary(self, path):
+        with open(path, "w") as f:
+            json.dump(self.summary(), f, indent=4)
+
+    def write_trace(self, path):
+        with open(path, "w") as f:
+            json.dump({"traceEvents": self.trace_events}, f)
+
+
+def format_summary(summary):
+    lines = [f"{summary['battles']} battles"]
+    lines.append(f"\n{'phase':<22}{'calls':>10}{'total s':>10}{'mean µs':>10}")
+    for name, phase in summary["phases"].items():
+        lines.append(
+            f"{name:<22}{phase['calls']:>10}"
+            f"{phase['total_seconds']:>10.3f}{phase['mean_us']:>10.2f}"
+        )
+    lines.append(f"\n{'move':<22}{'uses':>10}{'misses':>10}")
+    for name, move in summary["moves"].items():
+        lines.append(f"{name:<22}{move['uses']:>10}{move['misses']:>10}")
+    lines.append(f"\nguard breaks: {summary['guard_breaks']}")
+    lines.append(f"announced ability triggers: {summary['announced_ability_triggers']}")
+    lines.append(f"weather changes: {summary['weather_changes']}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    from knight_ai_training import RandomPolicy
+    from headless_battle import HeadlessBattle
+    from knight_battle_game import Player, Warband
+
+    parser = argparse.ArgumentParser(
+        description="Play instrumented headless battles and report where time goes."
+    )
+    parser.add_argument("team1", nargs="?", default="co.json")
+    parser.add_argument("team2", nargs="?", default="ug.json")
+    parser.add_argument("-n", "--battles", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", metavar="PATH", help="write the aggregates as JSON")
+    parser.add_argument(
+        "--trace", metavar="PATH", help="write the first battle as a Chrome trace"
+    )
+    args = parser.parse_args()
+
+    warband1 = Warband.from_file(os.path.join(script_dir, args.team1))
+    warband2 = Warband.from_file(os.path.join(script_dir, args.team2))
+    instrumentation = BattleInstrumentation(trace=bool(args.trace))
+    for i in range(args.battles):
+        p1 = Player("P1", warband1.knights())
+        p1.ai_logic = RandomPolicy()
+        p2 = Player("P2", warband2.knights())
+        p2.ai_logic = RandomPolicy()
+        battle = instrumentation.attach(HeadlessBattle(p1, p2, seed=args.seed + i))
+        battle.run_simulation()
+        instrumentation.detach()
+
+    print(format_summary(instrumentation.summary()))
+    if args.json:
+        instrumentation.write_summary(args.json)
+    if args.trace:
+        instrumentation.write_trace(args.trace)
@@ -1,27 +1,256 @@
 import random
 import json
-import copy
+from collections import OrderedDict
+import hashlib
 import os
+import struct
 import sys
+import zlib
 
 # Add the parent directory to the Python path to allow imports from the main folder
 script_dir = os.path.dirname(os.path.abspath(__file__))
 parent_dir = os.path.dirname(script_dir)
 sys.path.append(parent_dir)
 
-from gamedata import ALL_MOVES
-from knight_battle_game import Knight, Player, Battle
+from gamedata import ALL_MOVES, STATUS_EFFECTS, SYNERGY_EFFECTS
+from knight_battle_game import Player, Warband
+from knowledge_store import SQLiteKnowledge, is_store_path
+
+# --- State Keys ---
+#
+# A state is a canonical tuple of small integers: seven per active slot
+# (mine, mine, theirs, theirs) plus the weather. Knowledge is keyed by a
+# 64-bit hash of that tuple; describe_state() turns a state tuple back into
+# the readable key older brain files used.
+
+UNKNOWN_STATE = object()  # Knowledge may map a state to None
+MOVE_NAMES = tuple(ALL_MOVES)
+MOVE_IDS = {name: i for i, name in enumerate(MOVE_NAMES)}
+STAT_ORDER = ("atk", "def", "spd")
+EMPTY_SLOT = (0, 0, 0, 0, 0, 0, 0)
+STATE_PACKING = struct.Struct("<29q")
+TAGGED_STATE_PACKING = struct.Struct("<30q")
+LEVELS_KEY = "levels"  # Reserved brain file entry naming the abstraction levels
+
+_name_ids = {}  # name -> id, kept so states can be described again
+_names = {}  # id -> name
+
+
+def name_id(name):
+    """Stable id for a knight or weather name."""
+    i = _name_ids.get(name)
+    if i is None:
+        i = _name_ids[name] = zlib.crc32(name.encode("utf-8"))
+        _names[i] = name
+    return i
+
+
+def knight_state(knight):
+    if not knight:
+        return EMPTY_SLOT
+    stages = knight.stat_stages
+    return (
+        name_id(knight.name),
+        int(knight.hp / knight.max_hp * 100),
+        knight.status_effects.mask,
+        stages["atk"],
+        stages["def"],
+        stages["spd"],
+        knight.active_effects.mask,
+    )
+
+
+def state_hash(state, tag=0):
+    """64-bit key for a state tuple. Abstraction levels other than exact pass
+    their tag so their keys never collide with exact ones."""
+    flat = [value for slot in state[:4] for value in slot]
+    flat.append(state[4])
+    if tag:
+        flat.append(tag)
+        data = TAGGED_STATE_PACKING.pack(*flat)
+    else:
+        data = STATE_PACKING.pack(*flat)
+    digest = hashlib.blake2b(data, digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+# --- State Abstraction ---
+class StateAbstraction:
+    """How much of a state a key keeps. Coarser levels let similar states
+    share one entry: HP is bucketed, stat stages are clamped, and statuses
+    or effects can be dropped."""
+
+    def __init__(
+        self, name, tag, hp_buckets=100, stage_limit=6, statuses=True, effects=True
+    ):
+        self.name = name
+        self.tag = tag
+        self.hp_buckets = hp_buckets
+        self.stage_limit = stage_limit
+        self.statuses = statuses
+        self.effects = effects
+        self.exact = tag == 0
+
+    def _slot(self, slot):
+        if slot == EMPTY_SLOT:
+            return slot
+        name, hp, statuses, atk, dfn, spd, effects = slot
+        limit = self.stage_limit
+        return (
+            name,
+            min(self.hp_buckets - 1, max(0, hp * self.hp_buckets // 100)),
+            statuses if self.statuses else 0,
+            max(-limit, min(limit, atk)),
+            max(-limit, min(limit, dfn)),
+            max(-limit, min(limit, spd)),
+            effects if self.effects else 0,
+        )
+
+    def apply(self, state):
+        if self.exact:
+            return state
+        return (*(self._slot(slot) for slot in state[:4]), state[4])
+
+    def key(self, state):
+        return state_hash(self.apply(state), self.tag)
+
+    def __repr__(self):
+        return f"StateAbstraction({self.name!r})"
+
+
+ABSTRACTIONS = {
+    level.name: level
+    for level in (
+        StateAbstraction("exact", 0),
+        StateAbstraction("fine", 1, hp_buckets=10, stage_limit=2),
+        StateAbstraction("coarse", 2, hp_buckets=4, stage_limit=1, effects=False),
+        StateAbstraction(
+            "minimal", 3, hp_buckets=4, stage_limit=0, statuses=False, effects=False
+        ),
+    )
+}
+DEFAULT_LEVELS = (ABSTRACTIONS["exact"],)
+
+
+def resolve_levels(levels):
+    """Turn level names or StateAbstraction objects into a tuple of levels,
+    the first being the one learned into and the rest the backoff chain."""
+    if isinstance(levels, str):
+        levels = levels.split(",")
+    return tuple(
+        ABSTRACTIONS[level] if isinstance(level, str) else level for level in levels
+    )
+
+
+def _mask_names(mask, names):
+    return sorted(name for i, name in enumerate(names) if (mask >> i) & 1)
+
+
+def describe_state(state):
+    """The readable form of a state tuple, for debugging."""
+
+    def describe_knight(slot):
+        if slot == EMPTY_SLOT:
+            return "empty"
+        name, hp, statuses, atk, dfn, spd, effects = slot
+        details = [_names.get(name, f"#{name}"), f"hp:{hp}"]
+        if statuses:
+            details.append(f"status:{','.join(_mask_names(statuses, STATUS_EFFECTS))}")
+        stats = [
+            f"{stat}:{val:+}" for stat, val in zip(STAT_ORDER, (atk, dfn, spd)) if val
+        ]
+        if stats:
+            details.append(f"stats:{','.join(stats)}")
+        if effects:
+            details.append(f"fx:{','.join(_mask_names(effects, SYNERGY_EFFECTS))}")
+        return "|".join(details)
+
+    mine = ";".join(describe_knight(slot) for slot in state[:2])
+    theirs = ";".join(describe_knight(slot) for slot in state[2:4])
+    weather = _names.get(state[4], f"#{state[4]}")
+    return f"MyTeam:{mine}_vs_TheirTeam:{theirs}_Weather:{weather}"
+
+
+def parse_state(text):
+    """Inverse of describe_state, used to read brain files with readable keys."""
+
+    def mask_of(names, table):
+        return sum(1 << table.index(name) for name in names.split(","))
+
+    def parse_knight(part):
+        if part == "empty":
+            return EMPTY_SLOT
+        name, *fields = part.split("|")
+        hp = statuses = effects = 0
+        stages = dict.fromkeys(STAT_ORDER, 0)
+        for field in fields:
+            label, _, value = field.partition(":")
+            if label == "hp":
+                hp = int(value)
+            elif label == "status":
+                statuses = mask_of(value, STATUS_EFFECTS)
+            elif label == "fx":
+                effects = mask_of(value, SYNERGY_EFFECTS)
+            elif label == "stats":
+                for stat in value.split(","):
+                    key, _, delta = stat.partition(":")
+                    stages[key] = int(delta)
+        return (name_id(name), hp, statuses, *stages.values(), effects)
+
+    teams, _, weather = text.partition("_Weather:")
+    mine, _, theirs = teams.partition("_vs_TheirTeam:")
+    slots = mine.removeprefix("MyTeam:").split(";") + theirs.split(";")
+    return (*(parse_knight(part) for part in slots), name_id(weather))
+
+
+class ExplorationBuffer:
+    """Moves tried in states the knowledge table does not have yet, with
+    visit counts. Holds at most `limit` states, evicting the least recently
+    visited first."""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.entries = OrderedDict()  # state key -> [move name, visits]
+
+    def visit(self, key):
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+            entry[1] += 1
+        return entry
+
+    def add(self, key, move_name):
+        self.entries[key] = [move_name, 1]
+        if len(self.entries) > self.limit:
+            self.entries.popitem(last=False)
+
+    def pop(self, key):
+        return self.entries.pop(key, None)
+
+    def copy(self):
+        buffer = ExplorationBuffer(self.limit)
+        buffer.entries = OrderedDict(
+            (key, entry[:]) for key, entry in self.entries.items()
+        )
+        return buffer
+
+    def __len__(self):
+        return len(self.entries)
 
 
 class AIPlayer:
-    def __init__(self, name, team_file_path):
-        self.player = Player(name, self.load_team(team_file_path))
-        self.brain = AIBrain()
+    """Decision logic for a Player, optionally with a team of its own.
+    Without a team file it is pure logic, as in training."""
+
+    def __init__(self, name, team_file_path=None, brain=None):
+        self.name = name
+        self.player = None
+        if team_file_path:
+            self.player = Player(name, self.load_team(team_file_path))
+        self.brain = brain if brain is not None else AIBrain()
 
     def load_team(self, file_path):
-        with open(file_path, "r") as f:
-            team_data = json.load(f)
-        return [Knight(knight_data) for knight_data in team_data]
+        return Warband.from_file(file_path).knights()
 
     def get_action(self, battle_state, owner, opponent_player, acting_knight):
         return self.brain.get_best_move(
@@ -29,39 +258,202 @@ class AIPlayer:
         )
 
 
+class RandomPolicy:
+    """ai_logic that picks a uniformly random move each decision, targeting
+    like AIBrain. This is the policy batch_battle.BatchBattle simulates."""
+
+    def __init__(self):
+        self.brain = AIBrain()
+
+    def get_action(self, battle_state, owner, opponent_player, acting_knight):
+        if not acting_knight or acting_knight.is_fainted:
+            return None, None
+        move = battle_state.rng.choice(acting_knight.moves)
+        return move, self.brain.choose_targets(
+            move, owner, opponent_player, acting_knight, battle_state.rng
+        )
+
+
 class AIBrain:
-    def __init__(self, brain_file=None):
+    def __init__(
+        self,
+        brain_file=None,
+        rng=None,
+        levels=None,
+        frozen=False,
+        exploration_limit=None,
+        promote_after=2,
+        track_visits=False,
+        track_legal=False,
+    ):
         self.brain_file = brain_file
+        self.rng = rng  # None: use the RNG of the battle being played
+        # None: use the levels saved in the brain file, else exact keys only
+        self.levels = resolve_levels(levels) if levels else None
         self.knowledge = self.load_knowledge() if brain_file else {}
+        if self.levels is None:
+            self.levels = DEFAULT_LEVELS
+        # A frozen brain never writes to its knowledge, e.g. when serving games.
+        self.frozen = frozen
+        # With a limit, unseen states are explored in a bounded buffer and only
+        # join the knowledge once visited promote_after times.
+        self.exploration = (
+            ExplorationBuffer(exploration_limit) if exploration_limit else None
+        )
+        self.promote_after = promote_after
+        # Per-state visit counts, so rarely seen states can be pruned by compact()
+        self.visits = {} if track_visits else None
+        # Per-state ids of the moves the knight that learned it knows, so
+        # mutation can stay within legal moves
+        self.legal_moves = {} if track_legal else None
         self.fitness = 0
 
+    def level_names(self):
+        return [level.name for level in self.levels]
+
+    def _saved_levels(self, names):
+        if names and self.levels is None:
+            self.levels = resolve_levels(names)
+
     def load_knowledge(self):
+        if is_store_path(self.brain_file):
+            store = SQLiteKnowledge(self.brain_file)
+            self._saved_levels(store.get_meta(LEVELS_KEY))
+            return store
         try:
             with open(self.brain_file, "r") as f:
-                return json.load(f)
+                saved = json.load(f)
         except (FileNotFoundError, json.JSONDecodeError):
             return {}
+        self._saved_levels(saved.pop(LEVELS_KEY, None))
+        knowledge = {}
+        for key, move_name in saved.items():
+            if move_name is None:
+                continue  # Empty genes are not stored
+            if move_name in ALL_MOVES:
+                move_name = ALL_MOVES[move_name].name  # Share one string per move
+            if key.isdigit():
+                knowledge[int(key)] = move_name
+            else:
+                # Brain files saved before keys were hashed
+                knowledge[state_hash(parse_state(key))] = move_name
+        return knowledge
+
+    def compact(self, min_visits=0):
+        """Drop empty genes and, when visits are tracked, states visited fewer
+        than min_visits times. Returns how many states were removed."""
+        knowledge = self.knowledge
+        removed = 0
+        if isinstance(knowledge, SQLiteKnowledge):
+            removed = knowledge.drop_empty()
+        visits = self.visits if min_visits else None
+        drop = [
+            key
+            for key, move_name in knowledge.items()
+            if move_name is None
+            or (visits is not None and visits.get(key, 0) < min_visits)
+        ]
+        for key in drop:
+            del knowledge[key]
+            if visits is not None:
+                visits.pop(key, None)
+        return removed + len(drop)
 
     def save_knowledge(self):
-        if self.brain_file:
+        if not self.brain_file:
+            return
+        levels = None if self.levels == DEFAULT_LEVELS else self.level_names()
+        if isinstance(self.knowledge, SQLiteKnowledge):
+            self.knowledge.set_meta(LEVELS_KEY, levels)
+            self.knowledge.commit()
+        elif is_store_path(self.brain_file):
+            with SQLiteKnowledge(self.brain_file) as store:
+                store.clear()
+                store.set_meta(LEVELS_KEY, levels)
+                store.update(self.knowledge)
+        else:
+            saved = self.knowledge
+            if levels:
+                saved = {LEVELS_KEY: levels, **{str(k): v for k, v in saved.items()}}
             with open(self.brain_file, "w") as f:
-                json.dump(self.knowledge, f, indent=4)
+                json.dump(saved, f, indent=4)
 
     def get_best_move(self, battle_state, ai_player, opponent_player, active_knight):
-        state_key = self.get_state_key(ai_player, opponent_player)
+        state_keys = self.get_state_keys(ai_player, opponent_player, battle_state)
 
         if not active_knight or active_knight.is_fainted:
             return None, None
 
-        if state_key in self.knowledge:
-            move_name = self.knowledge.get(state_key)
+        rng = self.rng or getattr(battle_state, "rng", random)
+
+        # Back off to coarser keys until one is known
+        knowledge = self.knowledge
+        move_name = UNKNOWN_STATE
+        for depth, state_key in enumerate(state_keys):
+            move_name = knowledge.get(state_key, UNKNOWN_STATE)
+            if move_name is not UNKNOWN_STATE:
+                visits = self.visits
+                if visits is not None:
+                    visits[state_key] = visits.get(state_key, 0) + 1
+                break
+        else:
+            depth = len(state_keys)
+
+        explored = None
+        if depth and self.exploration is not None:
+            explored = self.exploration.visit(state_keys[0])
+            if explored is not None:
+                move_name = explored[0]
+
+        if move_name is not UNKNOWN_STATE:
             move = next((m for m in active_knight.moves if m.name == move_name), None)
             if move is None:
-                move = random.choice(active_knight.moves)
+                move = rng.choice(active_knight.moves)
         else:
-            move = random.choice(active_knight.moves)
-            self.knowledge[state_key] = move.name
+            move = rng.choice(active_knight.moves)
+            move_name = move.name
+
+        if depth:
+            if explored is None:
+                self.explore(state_keys[:depth], move_name, active_knight)
+            elif not self.frozen and explored[1] >= self.promote_after:
+                self.exploration.pop(state_keys[0])
+                self.learn(state_keys[:depth], move_name, explored[1], active_knight)
+
+        return move, self.choose_targets(
+            move, ai_player, opponent_player, active_knight, rng
+        )
+
+    # A brain can serve directly as a Player's ai_logic
+    get_action = get_best_move
+
+    def sparring_copy(self):
+        """A frozen view of this brain to fight against: it reads the same
+        knowledge but records nothing."""
+        brain = AIBrain(rng=self.rng, levels=self.levels, frozen=True)
+        brain.knowledge = self.knowledge
+        return brain
+
+    def explore(self, state_keys, move_name, knight=None):
+        """Record the move picked for states the knowledge table lacks."""
+        if self.exploration is not None:
+            self.exploration.add(state_keys[0], move_name)
+        elif not self.frozen:
+            self.learn(state_keys, move_name, knight=knight)
+
+    def learn(self, state_keys, move_name, visits=1, knight=None):
+        # Finer levels that missed start from what the coarser level knew
+        legal = None
+        if self.legal_moves is not None and knight is not None:
+            legal = tuple(MOVE_IDS[m.name] for m in knight.moves)
+        for state_key in state_keys:
+            self.knowledge[state_key] = move_name
+            if self.visits is not None:
+                self.visits[state_key] = visits
+            if legal is not None:
+                self.legal_moves[state_key] = legal
 
+    def choose_targets(self, move, ai_player, opponent_player, active_knight, rng):
         targets = []
         if move.target_type == "self":
             targets = [active_knight]
@@ -109,39 +501,29 @@ class AIBrain:
                 if k and not k.is_fainted and not k.is_invisible
             ]
             if possible_targets:
-                targets = [random.choice(possible_targets)]
+                targets = [rng.choice(possible_targets)]
 
-        return move, targets
+        return targets
 
-    def get_state_key(self, ai_player, opponent_player):
-        def get_knight_details(knight):
-            if not knight:
-                return "empty"
-
-            details = [
-                knight.name,
-                f"hp:{int(knight.hp/knight.max_hp*100)}",
-            ]
-            if knight.status_effects:
-                details.append(
-                    f"status:{','.join(sorted(knight.status_effects.keys()))}"
-                )
-            if any(v != 0 for v in knight.stat_stages.values()):
-                stats = []
-                for stat, val in knight.stat_stages.items():
-                    if val != 0:
-                        stats.append(f"{stat}:{val:+}")
-                details.append(f"stats:{','.join(sorted(stats))}")
-            if knight.active_effects:
-                details.append(f"fx:{','.join(sorted(knight.active_effects.keys()))}")
-
-            return "|".join(details)
-
-        my_knights_str = [get_knight_details(k) for k in ai_player.active_knights]
-        opponent_knights_str = [
-            get_knight_details(k) for k in opponent_player.active_knights
-        ]
+    def get_state(self, ai_player, opponent_player, battle_state=None):
+        """The canonical state tuple for a decision; see describe_state()."""
+        mine = ai_player.active_knights
+        theirs = opponent_player.active_knights
+        weather = battle_state.current_weather["type"] if battle_state else "Clear"
+        return (
+            knight_state(mine[0]),
+            knight_state(mine[1]),
+            knight_state(theirs[0]),
+            knight_state(theirs[1]),
+            name_id(weather),
+        )
 
-        weather = Battle.current_weather["type"]
+    def get_state_key(self, ai_player, opponent_player, battle_state=None):
+        """Key at the level this brain learns into."""
+        state = self.get_state(ai_player, opponent_player, battle_state)
+        return self.levels[0].key(state)
 
-        return f"MyTeam:{';'.join(my_knights_str)}_vs_TheirTeam:{';'.join(opponent_knights_str)}_Weather:{weather}"
+    def get_state_keys(self, ai_player, opponent_player, battle_state=None):
+        """Keys from the learned level down the backoff chain."""
+        state = self.get_state(ai_player, opponent_player, battle_state)
+        return [level.key(state) for level in self.levels]
@@ -1,36 +1,171 @@
 import time
 import random
+import copy
 import os
 import base64
 import json
-import copy
-from gamedata import ALL_KNIGHTS, ALL_MOVES, ALL_ABILITIES, Move
+from collections.abc import MutableMapping
+import battle_log
+from battle_rng import new_rng
+from gamedata import (
+    ALL_KNIGHTS,
+    ALL_MOVES,
+    ALL_ABILITIES,
+    Move,
+    STATUS_EFFECTS,
+    SYNERGY_EFFECTS,
+    EFFECT_STATUS,
+    EFFECT_RECOIL,
+)
 
 # --- Global Settings ---
 SILENT_MODE = False
 
 
+# Stat stage -> multiplier, indexable directly by stages -6..+6.
+STAGE_MULTIPLIERS = {stage: 1.0 + stage * 0.25 for stage in range(-6, 7)}
+
+
 # --- Utility Functions ---
-def clear_screen():
-    if not SILENT_MODE:
+def is_silent(silent=None):
+    """Per-battle silence wins; fall back to the module toggle when not given."""
+    return SILENT_MODE if silent is None else silent
+
+
+def clear_screen(silent=None):
+    if not is_silent(silent):
         os.system("cls" if os.name == "nt" else "clear")
 
 
-def type_text(text, delay=0.03):
-    if not SILENT_MODE:
+def type_text(text, delay=0.03, silent=None):
+    if not is_silent(silent):
         for char in text:
             print(char, end="", flush=True)
             time.sleep(delay)
         print()
 
 
-def user_input(prompt):
-    if not SILENT_MODE:
+def user_input(prompt, silent=None):
+    if not is_silent(silent):
         return input(prompt)
     return "1"  # Default AI/headless input to prevent hanging
 
 
+class DisplaySink:
+    """Types battle events out to the terminal when the battlefield is shown."""
+
+    def __init__(self, delay=0.02):
+        self.delay = delay
+
+    def write_events(self, events):
+        for code, args in events:
+            type_text(battle_log.render(code, args), delay=self.delay, silent=False)
+
+
 # --- Core Game Classes ---
+class TimerTable(MutableMapping):
+    """Turn counters for a fixed set of names, stored as a bytearray plus a
+    presence bitmask. Reads like the dict it replaces, keyed by name."""
+
+    __slots__ = ("names", "index", "timers", "mask")
+
+    def __init__(self, names, index=None):
+        self.names = names
+        self.index = index if index is not None else make_index(names)
+        self.timers = bytearray(len(names))
+        self.mask = 0
+
+    def __contains__(self, name):
+        i = self.index.get(name)
+        return i is not None and (self.mask >> i) & 1 == 1
+
+    def __getitem__(self, name):
+        if name not in self:
+            raise KeyError(name)
+        return self.timers[self.index[name]]
+
+    def __setitem__(self, name, turns):
+        self.set(self.index[name], turns)
+
+    def set(self, i, turns):
+        """Start the timer in slot i, clamped to what a byte can hold."""
+        self.timers[i] = turns if 0 <= turns <= 255 else max(0, min(255, turns))
+        self.mask |= 1 << i
+
+    def __delitem__(self, name):
+        if name not in self:
+            raise KeyError(name)
+        i = self.index[name]
+        self.timers[i] = 0
+        self.mask &= ~(1 << i)
+
+    def __iter__(self):
+        mask = self.mask
+        return (name for i, name in enumerate(self.names) if (mask >> i) & 1)
+
+    def __len__(self):
+        return self.mask.bit_count()
+
+    def __bool__(self):
+        return self.mask != 0
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+    def clear(self):
+        self.timers[:] = bytes(len(self.timers))
+        self.mask = 0
+
+    def tick(self):
+        """Count every active timer down by one; returns the names that ran out."""
+        expired = []
+        mask = self.mask
+        timers = self.timers
+        while mask:
+            bit = mask & -mask
+            mask ^= bit
+            i = bit.bit_length() - 1
+            turns = timers[i] - 1
+            if turns <= 0:
+                timers[i] = 0
+                self.mask ^= bit
+                expired.append(self.names[i])
+            else:
+                timers[i] = turns
+        return expired
+
+
+def make_index(names):
+    return {name: i for i, name in enumerate(names)}
+
+
+_LAYOUTS = {}
+
+
+def timer_layout(names):
+    """Shared (names, index) pair so knights with the same moves share one index."""
+    names = tuple(dict.fromkeys(names))
+    layout = _LAYOUTS.get(names)
+    if layout is None:
+        layout = _LAYOUTS[names] = (names, make_index(names))
+    return layout
+
+
+STATUS_INDEX = make_index(STATUS_EFFECTS)
+EFFECT_INDEX = make_index(SYNERGY_EFFECTS)
+
+# Presence bits for the statuses and effects the engine checks on hot paths.
+BURNED = 1 << STATUS_INDEX["burned"]
+SLOWED = 1 << STATUS_INDEX["slowed"]
+CURSED = 1 << STATUS_INDEX["cursed"]
+DAZED = 1 << STATUS_INDEX["dazed"]
+VULNERABLE = 1 << STATUS_INDEX["vulnerable"]
+WEAKEN = 1 << STATUS_INDEX["weaken"]
+CONSECRATION = 1 << EFFECT_INDEX["consecration"]
+EYE_OF_THE_STORM = 1 << EFFECT_INDEX["eye_of_the_storm"]
+MISTS_OF_BOREALIS = 1 << EFFECT_INDEX["mists_of_borealis"]
+
+
 class Knight:
     def __init__(self, custom_data):
         self.name = custom_data["custom_name"]
@@ -38,13 +173,16 @@ class Knight:
         self.faction = template.faction
         self.base_stats = custom_data["stats"]
         self.ability = ALL_ABILITIES[custom_data["ability"]]
-        self.moves = [copy.deepcopy(ALL_MOVES[m]) for m in custom_data["moves"]]
-
-        self.hp = self.base_stats["hp"]
+        self.moves = [ALL_MOVES[m] for m in custom_data["moves"]]
         self.max_hp = self.base_stats["hp"]
+        self.reset()
+
+    def reset(self):
+        """Put this knight back to how it starts a battle, outside any team."""
+        self.hp = self.max_hp
         self.guard = 0
-        self.status_effects = {}
-        self.active_effects = {}
+        self.status_effects = TimerTable(STATUS_EFFECTS, STATUS_INDEX)
+        self.active_effects = TimerTable(SYNERGY_EFFECTS, EFFECT_INDEX)
         self.is_fainted = False
         self.charge_state = None
         self.rampage_state = None
@@ -52,92 +190,129 @@ class Knight:
         self.is_aegis_protected = False
         self.is_invisible = False
         self.consecutive_protects = 0
-        self.disabled_moves = {}
+        self.disabled_moves = TimerTable(*timer_layout(m.name for m in self.moves))
         self.stat_stages = {"atk": 0, "def": 0, "spd": 0}
         self.last_damage_taken = 0
+        self.owner = None  # The Player whose team this knight is on
+        self.slot = None  # Index into owner.active_knights, None when benched
+        self.battle = None  # Set by the Battle this knight is fighting in
+        self.log = battle_log.NULL_LOG
+        self.rng = None  # The battle's own stream; None outside a battle
+        self._stat_cache = None
+
+    def clone(self):
+        """A fresh knight sharing this one's template data, ready for battle."""
+        knight = copy.copy(self)
+        knight.reset()
+        return knight
+
+    @property
+    def weather(self):
+        """The weather of the battle this knight belongs to."""
+        if self.battle is None:
+            return "Clear"
+        return self.battle.current_weather["type"]
+
+    def invalidate_stats(self):
+        """Drop the cached effective stats after a stage, status or weather change."""
+        self._stat_cache = None
+
+    def _compute_stats(self):
+        atk = self.base_stats["atk"] * STAGE_MULTIPLIERS[self.stat_stages["atk"]]
+        statuses = self.status_effects.mask
+        if statuses & WEAKEN:
+            atk *= 0.75
+        if self.ability.name == "Adrenaline" and statuses:
+            atk *= 1.5
+        low_hp = self.ability.name == "Last Stand" and self.hp <= self.max_hp / 3
+        if low_hp:
+            atk *= 1.5
+        weather = self.weather
+        if self.ability.name == "Divine Power" and weather == "Blazing Sun":
+            atk *= 1.5
+
+        dfn = self.base_stats["def"] * STAGE_MULTIPLIERS[self.stat_stages["def"]]
+        if statuses & VULNERABLE:
+            dfn *= 0.75
+        if weather == "Metalstorm" and self.faction == "Steel":
+            dfn *= 1.2
+        if weather == "Hailstorm" and self.faction == "Cryo":
+            dfn *= 1.2
+
+        spd = self.base_stats["spd"] * STAGE_MULTIPLIERS[self.stat_stages["spd"]]
+        if statuses & SLOWED and self.ability.name != "Grounded":
+            spd *= 0.75
+        if self.ability.name == "Chilling Finesse" and weather == "Hailstorm":
+            spd *= 2
+
+        self._stat_cache = (int(atk), int(dfn), int(spd), low_hp)
+        return self._stat_cache
 
     @property
     def attack(self):
-        val = self.base_stats["atk"]
-        stage_mod = 1.0 + (self.stat_stages["atk"] * 0.25)
-        val *= stage_mod
-        if "weaken" in self.status_effects:
-            val *= 0.75
-        if self.ability.name == "Adrenaline" and self.status_effects:
-            val *= 1.5
-        if self.ability.name == "Last Stand" and self.hp <= self.max_hp / 3:
-            val *= 1.5
-        if (
-            self.ability.name == "Divine Power"
-            and Battle.current_weather["type"] == "Blazing Sun"
+        cache = self._stat_cache
+        if cache is None:
+            cache = self._compute_stats()
+        elif self.ability.name == "Last Stand" and cache[3] != (
+            self.hp <= self.max_hp / 3
         ):
-            val *= 1.5
-        return int(val)
+            # Crossing the Last Stand threshold is the only HP change that matters.
+            cache = self._compute_stats()
+        return cache[0]
 
     @property
     def defense(self):
-        val = self.base_stats["def"]
-        stage_mod = 1.0 + (self.stat_stages["def"] * 0.25)
-        val *= stage_mod
-        if "vulnerable" in self.status_effects:
-            val *= 0.75
-        if Battle.current_weather["type"] == "Metalstorm" and self.faction == "Steel":
-            val *= 1.2
-        if Battle.current_weather["type"] == "Hailstorm" and self.faction == "Cryo":
-            val *= 1.2
-        return int(val)
+        cache = self._stat_cache
+        if cache is None:
+            cache = self._compute_stats()
+        return cache[1]
 
     @property
     def speed(self):
-        val = self.base_stats["spd"]
-        stage_mod = 1.0 + (self.stat_stages["spd"] * 0.25)
-        val *= stage_mod
-        if "slowed" in self.status_effects and self.ability.name != "Grounded":
-            val *= 0.75
-        if (
-            self.ability.name == "Chilling Finesse"
-            and Battle.current_weather["type"] == "Hailstorm"
-        ):
-            val *= 2
-        return int(val)
+        cache = self._stat_cache
+        if cache is None:
+            cache = self._compute_stats()
+        return cache[2]
 
-    def apply_status(self, status, duration, attacker=None):
+    def apply_status(self, status, duration, attacker=None, announce=True):
+        """Inflict a status; returns True if it was newly applied."""
         if status == "slowed" and self.ability.name == "Grounded":
-            return f"{self.name}'s Grounded ability prevents it from being slowed!"
-        if status in ["burned", "slowed", "cursed", "dazed", "vulnerable", "weaken"]:
-            if status not in self.status_effects:
-                if attacker and attacker.ability.name == "Witch Doctor":
-                    duration += 2
-                self.status_effects[status] = duration
-
-                status_map = {
-                    "burned": "was set ablaze",
-                    "slowed": "felt a chill slow their pace",
-                    "cursed": "felt dread creep around their mind",
-                    "dazed": "clutched their helm in a daze",
-                    "vulnerable": "felt their armor splinter",
-                    "weaken": "felt their sword arm get sore",
-                }
-                display_status = status_map.get(status, status)
-                return f"{self.name} {display_status}."
-            else:
-                return f"{self.name} is already {status}"
-        elif "_" in status:
-            return self.apply_self_effect(status)
-        return ""
+            if announce:
+                self.log.emit(battle_log.STATUS_BLOCKED, self.name)
+            return False
+        i = STATUS_INDEX.get(status)
+        if i is None:
+            return False
+        if (self.status_effects.mask >> i) & 1:
+            if announce:
+                self.log.emit(battle_log.STATUS_ALREADY, self.name, status)
+            return False
+        if attacker and attacker.ability.name == "Witch Doctor":
+            duration += 2
+        self.status_effects.set(i, duration)
+        self.invalidate_stats()
+        if announce:
+            self.log.emit(battle_log.STATUS_APPLIED, self.name, status)
+        return True
+
+    def apply_effect(self, effect, duration, attacker=None):
+        """Apply a move's compiled effect to this knight as its target."""
+        if effect.kind == EFFECT_STATUS:
+            self.apply_status(effect.status, duration, attacker=attacker)
+        else:
+            self.apply_self_effect(effect)
 
     def take_damage(self, unmod_damage, move=None, ignore_defense=False):
-        logs = []
         if (
-            "eye_of_the_storm" in self.active_effects
-            and random.random() < 0.3
+            self.active_effects.mask & EYE_OF_THE_STORM
+            and (self.rng or random).random() < 0.3
             and not ignore_defense
         ):
-            logs.append(f"{self.name} avoided the attack with Eye of the Storm!")
-            return 0, logs
+            self.log.emit(battle_log.EVADE, self.name)
+            return 0
         damage = unmod_damage
         if not ignore_defense:
-            if "mists_of_borealis" in self.active_effects:
+            if self.active_effects.mask & MISTS_OF_BOREALIS:
                 damage = int(damage * 0.5)
             if self.ability.name == "Reinforced":
                 damage = int(damage * 0.9)
@@ -154,12 +329,10 @@ class Knight:
                         actual_reduction * move.guard_multiplier * 0.25
                     )
                 self.guard -= guard_depletion
-                logs.append(
-                    f"{self.name}'s Guard reduced the damage by {actual_reduction}!"
-                )
+                self.log.emit(battle_log.GUARD_REDUCED, self.name, actual_reduction)
                 if self.guard <= 0:
                     self.guard = 0
-                    logs.append(f"{self.name}'s Guard was broken!")
+                    self.log.emit(battle_log.GUARD_BROKEN, self.name)
 
         final_damage = max(1, damage)
         self.hp -= final_damage
@@ -168,74 +341,102 @@ class Knight:
         if self.ability.name == "Ice Shield" and final_damage > 0:
             guard_gain = int(final_damage * 0.15)
             self.guard += guard_gain
-            logs.append(f"{self.name}'s Ice Shield created {guard_gain} Guard!")
+            self.log.emit(battle_log.ICE_SHIELD, self.name, guard_gain)
 
         if self.hp <= 0:
             self.hp = 0
-            self.is_fainted = True
+            if not self.is_fainted:
+                self.is_fainted = True
+                if self.owner:
+                    self.owner.knight_fainted(self)
 
-        return final_damage, logs
+        return final_damage
 
     def apply_self_effect(self, effect, damage_dealt=0):
-        logs = []
-        simple_effects = ["slowed", "weaken", "vulnerable", "dazed"]
-        if effect in simple_effects:
-            logs.append(self.apply_status(effect, 2, attacker=self))
-            return logs
-        if "recoil" in effect:
-            parts = effect.split("_")
-            recoil_percent = int(parts[1])
-            recoil_dmg = max(1, int(damage_dealt * (recoil_percent / 100)))
-            logs.append(f"{self.name} took {recoil_dmg} in recoil damage!")
+        if effect.kind == EFFECT_STATUS:
+            self.apply_status(effect.status, 2, attacker=self)
+            return
+        if effect.kind == EFFECT_RECOIL:
+            recoil_dmg = max(1, int(damage_dealt * (effect.recoil_percent / 100)))
+            self.log.emit(battle_log.RECOIL, self.name, recoil_dmg)
             self.hp -= recoil_dmg
-            return logs
-
-        parts = effect.split("_")
-        for i in range(0, len(parts), 3):
-            stat_name = parts[i]
-            direction = parts[i + 1]
-            amount = int(parts[i + 2])
-
-            stat_key = ""
-            if stat_name == "attack":
-                stat_key = "atk"
-            elif stat_name == "defense":
-                stat_key = "def"
-            elif stat_name == "speed":
-                stat_key = "spd"
-            else:
-                continue
+            return
 
-            if direction == "up":
-                self.stat_stages[stat_key] = min(6, self.stat_stages[stat_key] + amount)
-                logs.append(f"{self.name}'s {stat_name.capitalize()} rose!")
-            elif direction == "down":
-                self.stat_stages[stat_key] = max(
-                    -6, self.stat_stages[stat_key] - amount
-                )
-                logs.append(f"{self.name}'s {stat_name.capitalize()} fell!")
-        return logs
+        for stat_key, stat_name, delta in effect.stages:
+            if delta > 0:
+                self.stat_stages[stat_key] = min(6, self.stat_stages[stat_key] + delta)
+                self.log.emit(battle_log.STAT_UP, self.name, stat_name)
+            else:
+                self.stat_stages[stat_key] = max(-6, self.stat_stages[stat_key] + delta)
+                self.log.emit(battle_log.STAT_DOWN, self.name, stat_name)
+            self.invalidate_stats()
 
     def tick_statuses(self):
-        logs = []
-        for status in list(self.status_effects.keys()):
-            self.status_effects[status] -= 1
-            if self.status_effects[status] <= 0:
-                del self.status_effects[status]
-                logs.append(f"{self.name} is no longer {status}.")
-        for effect in list(self.active_effects.keys()):
-            self.active_effects[effect] -= 1
-            if self.active_effects[effect] <= 0:
-                del self.active_effects[effect]
+        if self.status_effects.mask:
+            expired = self.status_effects.tick()
+            if expired:
+                self.invalidate_stats()
+            for status in expired:
+                self.log.emit(battle_log.STATUS_ENDED, self.name, status)
+        if self.active_effects.mask:
+            for effect in self.active_effects.tick():
                 if effect == "invisible":
                     self.is_invisible = False
-                logs.append(f"{self.name}'s {effect.replace('_', ' ')} wore off.")
-        for move_name in list(self.disabled_moves.keys()):
-            self.disabled_moves[move_name] -= 1
-            if self.disabled_moves[move_name] <= 0:
-                del self.disabled_moves[move_name]
-                logs.append(f"{self.name} can use {move_name} again.")
-        return logs
+                self.log.emit(battle_log.EFFECT_ENDED, self.name, effect)
+        if self.disabled_moves.mask:
+            for move_name in self.disabled_moves.tick():
+                self.log.emit(battle_log.MOVE_ENABLED, self.name, move_name)
+
+    def snapshot(self):
+        """Capture everything about this knight that can change in battle."""
+        return (
+            self.hp,
+            self.guard,
+            self.stat_stages["atk"],
+            self.stat_stages["def"],
+            self.stat_stages["spd"],
+            bytes(self.status_effects.timers),
+            self.status_effects.mask,
+            bytes(self.active_effects.timers),
+            self.active_effects.mask,
+            bytes(self.disabled_moves.timers),
+            self.disabled_moves.mask,
+            self.is_fainted,
+            self.charge_state,
+            self.rampage_state,
+            self.is_parrying,
+            self.is_aegis_protected,
+            self.is_invisible,
+            self.consecutive_protects,
+            self.last_damage_taken,
+        )
+
+    def restore(self, state):
+        """Put this knight back to a state taken with snapshot()."""
+        (
+            self.hp,
+            self.guard,
+            atk,
+            dfn,
+            spd,
+            self.status_effects.timers[:],
+            self.status_effects.mask,
+            self.active_effects.timers[:],
+            self.active_effects.mask,
+            self.disabled_moves.timers[:],
+            self.disabled_moves.mask,
+            self.is_fainted,
+            self.charge_state,
+            self.rampage_state,
+            self.is_parrying,
+            self.is_aegis_protected,
+            self.is_invisible,
+            self.consecutive_protects,
+            self.last_damage_taken,
+        ) = state
+        stages = self.stat_stages
+        stages["atk"], stages["def"], stages["spd"] = atk, dfn, spd
+        self._stat_cache = None
 
     def display_status(self):
         bar_length = 15
@@ -273,33 +474,133 @@ class Knight:
         return f"{hp_str} {guard_str} {stat_str} {status_str} {active_effects_str}"
 
 
+class ActiveSlots(list):
+    """The two active slots of a Player. Writes keep each knight's slot and
+    the owner's bench index up to date."""
+
+    __slots__ = ("owner",)
+
+    def __init__(self, owner, knights=(None, None)):
+        super().__init__(knights)
+        self.owner = owner
+
+    def __setitem__(self, index, value):
+        for knight in self:
+            if knight:
+                knight.slot = None
+        super().__setitem__(index, value)
+        for i, knight in enumerate(self):
+            if knight:
+                knight.slot = i
+        self.owner._bench = None
+
+
 class Player:
     def __init__(self, name, team):
         self.name = name
         self.team = team
-        self.active_knights = [None, None]
+        for knight in team:
+            knight.owner = self
+            knight.slot = None
+        self.living = sum(1 for k in team if not k.is_fainted)
+        self._bench = None  # Living knights not in a slot; rebuilt after a change
+        self._active = ActiveSlots(self)
         self.is_aoe_protected = False
 
+    @property
+    def active_knights(self):
+        return self._active
+
+    @active_knights.setter
+    def active_knights(self, knights):
+        # Slice assignment keeps the list identity that charge targets may hold.
+        self._active[:] = knights
+
+    def knight_fainted(self, knight):
+        self.living -= 1
+        self._bench = None
+
     def has_living_knights(self):
-        return any(not k.is_fainted for k in self.team)
+        return self.living > 0
 
     def get_living_bench(self):
-        return [
-            k for k in self.team if not k.is_fainted and k not in self.active_knights
-        ]
+        bench = self._bench
+        if bench is None:
+            bench = self._bench = [
+                k for k in self.team if k.slot is None and not k.is_fainted
+            ]
+        return bench
+
+    def snapshot(self):
+        return (
+            tuple(self.active_knights),
+            self.is_aoe_protected,
+            tuple(k.snapshot() for k in self.team),
+        )
+
+    def restore(self, state):
+        active, self.is_aoe_protected, knights = state
+        self.active_knights = active
+        for knight, knight_state in zip(self.team, knights):
+            knight.restore(knight_state)
+        self.living = sum(1 for k in self.team if not k.is_fainted)
+        self._bench = None
 
 
 class Battle:
-    current_weather = {"type": "Clear", "turns_left": 0}
+    silent = None  # None defers to the module-wide SILENT_MODE toggle
 
-    def __init__(self, player1, player2):
+    def __init__(self, player1, player2, seed=None, rng=None):
         self.p1 = player1
         self.p2 = player2
-        self.log = []
+        # Each battle owns its RNG; the seed is kept so the battle can be replayed.
+        if rng is None:
+            seed, rng = new_rng(seed)
+        self.seed = seed
+        self.rng = rng
+        self.silent = is_silent(self.silent)
+        self.log = battle_log.BattleLog()
+        if not self.silent:
+            self.log.attach(DisplaySink())
+        # Weather is owned by each battle so concurrent battles never share it.
+        self.current_weather = {"type": "Clear", "turns_left": 0}
+        for knight in self.p1.team + self.p2.team:
+            knight.battle = self
+            knight.log = self.log
+            knight.rng = self.rng
+
+    def snapshot(self, include_rng=True):
+        """Capture the full battle state cheaply, for lookahead search.
+
+        Knights, moves and players are not copied; restore() writes the saved
+        values back into the same objects. Saving the RNG is about half the
+        cost, so searches that reseed anyway can skip it."""
+        return (
+            self.p1.snapshot(),
+            self.p2.snapshot(),
+            self.current_weather["type"],
+            self.current_weather["turns_left"],
+            self.rng.getstate() if include_rng else None,
+        )
+
+    def restore(self, state):
+        p1_state, p2_state, weather_type, turns_left, rng_state = state
+        self.p1.restore(p1_state)
+        self.p2.restore(p2_state)
+        self.current_weather["type"] = weather_type
+        self.current_weather["turns_left"] = turns_left
+        if rng_state is not None:
+            self.rng.setstate(rng_state)
+
+    def set_weather(self, weather_type, turns_left):
+        self.current_weather["type"] = weather_type
+        self.current_weather["turns_left"] = turns_left
+        for knight in self.p1.team + self.p2.team:
+            knight.invalidate_stats()
 
     def display_battlefield(self):
-        clear_screen()
-        if not SILENT_MODE:
+        clear_screen(self.silent)
+        if not self.silent:
             print("=" * 70)
             weather = (
                 f"Weather: {self.current_weather['type']} ({self.current_weather['turns_left']} turns left)"
@@ -326,10 +627,8 @@ class Battle:
                     print(f"       {knight.display_status()}")
             print("=" * 70)
 
-        for entry in self.log:
-            type_text(entry, delay=0.02)
-        self.log = []
-        if not SILENT_MODE:
+        self.log.flush()
+        if not self.silent:
             print()
 
     def run(self):
@@ -338,7 +637,7 @@ class Battle:
         while self.p1.has_living_knights() and self.p2.has_living_knights():
             self.prepare_round()
             self.display_battlefield()
-            self.log.append(f"--- Round {round_num} ---")
+            self.log.emit(battle_log.ROUND_START, round_num)
 
             actions = self.get_all_actions()
             actions.sort(
@@ -367,7 +666,7 @@ class Battle:
             self.end_of_round_effects()
             self.process_fainted()
             round_num += 1
-            user_input("\nPress Enter to continue...")
+            user_input("\nPress Enter to continue...", self.silent)
 
         self.announce_winner()
 
@@ -386,24 +685,30 @@ class Battle:
                 self.choose_knight_for_slot(player, i)
 
     def choose_knight_for_slot(self, player, slot_index):
-        clear_screen()
-        type_text(f"{player.name}, choose a Knight for slot {slot_index + 1}:")
+        clear_screen(self.silent)
+        type_text(
+            f"{player.name}, choose a Knight for slot {slot_index + 1}:",
+            silent=self.silent,
+        )
         benched = player.get_living_bench()
         for i, knight in enumerate(benched):
-            if not SILENT_MODE:
+            if not self.silent:
                 print(f"  {i+1}. {knight.name} ({knight.faction})")
 
         while True:
             try:
-                choice = int(user_input("Enter number: ")) - 1
+                choice = int(user_input("Enter number: ", self.silent)) - 1
                 if 0 <= choice < len(benched):
                     player.active_knights[slot_index] = benched[choice]
-                    type_text(f"{player.name} sends out {benched[choice].name}!")
-                    if not SILENT_MODE:
+                    type_text(
+                        f"{player.name} sends out {benched[choice].name}!",
+                        silent=self.silent,
+                    )
+                    if not self.silent:
                         time.sleep(1)
                     return
             except ValueError:
-                if not SILENT_MODE:
+                if not self.silent:
                     print("Invalid input.")
 
     def get_all_actions(self):
@@ -416,8 +721,8 @@ class Battle:
         # all_knights.sort(key=lambda k: k.speed, reverse=True)
 
         for knight in all_knights:
-            if "dazed" in knight.status_effects:
-                self.log.append(f"{knight.name} is dazed and cannot move!")
+            if knight.status_effects.mask & DAZED:
+                self.log.emit(battle_log.DAZED_SKIP, knight.name)
                 continue
 
             if knight.charge_state:
@@ -425,11 +730,11 @@ class Battle:
                 actions.append((knight, move, targets))
                 continue
 
-            owner = self.p1 if knight in self.p1.active_knights else self.p2
-            opponent_player = self.p2 if owner == self.p1 else self.p1
+            owner = knight.owner
+            opponent_player = self.p2 if owner is self.p1 else self.p1
 
             self.display_battlefield()
-            type_text(f"--- {owner.name}'s Turn: {knight.name} ---")
+            type_text(f"--- {owner.name}'s Turn: {knight.name} ---", silent=self.silent)
 
             action, details = self.get_action_for_knight(knight, owner, opponent_player)
 
@@ -437,35 +742,38 @@ class Battle:
                 move, target = details
                 actions.append((knight, move, target))
             elif action == "switch":
-                slot = owner.active_knights.index(knight)
-                owner.active_knights[slot] = details
-                self.log.append(
-                    f"{owner.name} recalls {knight.name} and sends out {details.name}!"
-                )
-                if not SILENT_MODE:
+                owner.active_knights[knight.slot] = details
+                self.log.emit(battle_log.SWITCH, owner.name, knight.name, details.name)
+                if not self.silent:
                     time.sleep(1)
 
         return actions
 
     def get_action_for_knight(self, knight, owner, opponent_player):
         while True:
-            if not SILENT_MODE:
+            if not self.silent:
                 print(f"What will {knight.name} do?")
                 print("1. Fight")
                 print("2. Switch")
             try:
-                choice = int(user_input("Choice: "))
+                choice = int(user_input("Choice: ", self.silent))
                 if choice == 1:
                     while True:
                         self.display_battlefield()
-                        type_text(f"--- {owner.name}'s Turn: {knight.name} ---")
+                        type_text(
+                            f"--- {owner.name}'s Turn: {knight.name} ---",
+                            silent=self.silent,
+                        )
                         move = self.get_move_choice(knight)
                         if not move:
                             break
 
                         self.display_battlefield()
-                        type_text(f"--- {owner.name}'s Turn: {knight.name} ---")
-                        if not SILENT_MODE:
+                        type_text(
+                            f"--- {owner.name}'s Turn: {knight.name} ---",
+                            silent=self.silent,
+                        )
+                        if not self.silent:
                             print(f"Move: {move.name}")
                             print(f"Description: {move.description}")
 
@@ -474,11 +782,11 @@ class Battle:
                             "single_ally",
                         ]
                         prompt = "1. Select Target" if needs_target else "1. Confirm"
-                        if not SILENT_MODE:
+                        if not self.silent:
                             print(f"\n{prompt}")
                             print("2. Back")
 
-                        confirm_choice = user_input("Choice: ")
+                        confirm_choice = user_input("Choice: ", self.silent)
                         if confirm_choice == "1":
                             target = self.get_target(
                                 knight, move, owner, opponent_player
@@ -491,53 +799,53 @@ class Battle:
                     if benched_knight:
                         return "switch", benched_knight
             except ValueError:
-                if not SILENT_MODE:
+                if not self.silent:
                     print("Invalid input.")
 
     def get_move_choice(self, knight):
-        if not SILENT_MODE:
+        if not self.silent:
             print("Choose a move:")
         valid_moves = [m for m in knight.moves if m.name not in knight.disabled_moves]
         for i, move in enumerate(valid_moves):
-            if not SILENT_MODE:
+            if not self.silent:
                 print(f"  {i+1}. {move.name}")
-        if not SILENT_MODE:
+        if not self.silent:
             print(f"  {len(valid_moves)+1}. Back")
 
         while True:
             try:
-                choice = int(user_input("Move choice: ")) - 1
+                choice = int(user_input("Move choice: ", self.silent)) - 1
                 if 0 <= choice < len(valid_moves):
                     return valid_moves[choice]
                 elif choice == len(valid_moves):
                     return None
             except ValueError:
-                if not SILENT_MODE:
+                if not self.silent:
                     print("Invalid input.")
 
     def get_switch_choice(self, owner):
         benched = owner.get_living_bench()
         if not benched:
-            if not SILENT_MODE:
+            if not self.silent:
                 print("No knights to switch to!")
                 time.sleep(1)
             return None
-        if not SILENT_MODE:
+        if not self.silent:
             print("Switch to which knight?")
         for i, knight in enumerate(benched):
-            if not SILENT_MODE:
+            if not self.silent:
                 print(f"  {i+1}. {knight.name}")
-        if not SILENT_MODE:
+        if not self.silent:
             print(f"  {len(benched)+1}. Back")
         while True:
             try:
-                choice = int(user_input("Switch choice: ")) - 1
+                choice = int(user_input("Switch choice: ", self.silent)) - 1
                 if 0 <= choice < len(benched):
                     return benched[choice]
                 elif choice == len(benched):
                     return None
             except ValueError:
-                if not SILENT_MODE:
+                if not self.silent:
                     print("Invalid input.")
 
     def get_target(self, attacker, move, owner, opponent_player):
@@ -563,18 +871,18 @@ class Battle:
             if len(possible_targets) == 1:
                 return possible_targets
             else:
-                if not SILENT_MODE:
+                if not self.silent:
                     print("Choose a target:")
                 for i, t in enumerate(possible_targets):
-                    if not SILENT_MODE:
+                    if not self.silent:
                         print(f"  {i+1}. {t.name}")
                 while True:
                     try:
-                        choice = int(user_input("Target: ")) - 1
+                        choice = int(user_input("Target: ", self.silent)) - 1
                         if 0 <= choice < len(possible_targets):
                             return [possible_targets[choice]]
                     except ValueError:
-                        if not SILENT_MODE:
+                        if not self.silent:
                             print("Invalid input.")
 
         if move.target_type == "all_adjacent":
@@ -598,18 +906,18 @@ class Battle:
         if len(possible_targets) == 1 or move.target_type == "all_enemies":
             return opponent_player.active_knights  # Target all, even invisible ones
         else:
-            if not SILENT_MODE:
+            if not self.silent:
                 print("Choose a target:")
             for i, t in enumerate(possible_targets):
-                if not SILENT_MODE:
+                if not self.silent:
                     print(f"  {i+1}. {t.name}")
             while True:
                 try:
-                    choice = int(user_input("Target: ")) - 1
+                    choice = int(user_input("Target: ", self.silent)) - 1
                     if 0 <= choice < len(possible_targets):
                         return [possible_targets[choice]]
                 except ValueError:
-                    if not SILENT_MODE:
+                    if not self.silent:
                         print("Invalid input.")
 
     def execute_action(self, knight: Knight, move: Move, targets):
@@ -624,37 +932,35 @@ class Battle:
         if move.charge_turns > 0:
             if knight.charge_state == None and not skip_charge:
                 knight.charge_state = (move, targets)
-                self.log.append(f"Power gathers around {knight.name}!")
+                self.log.emit(battle_log.CHARGE_START, knight.name)
                 if move.name == "Umbral Step":
                     knight.is_invisible = True
                     knight.active_effects["invisible"] = 2
-                    self.log.append(f"{knight.name} vanished into the shadows!")
+                    self.log.emit(battle_log.VANISH, knight.name)
                 return
             else:
-                self.log.append(f"{knight.name}'s sword gleams with power!")
+                self.log.emit(battle_log.CHARGE_RELEASE, knight.name)
                 knight.charge_state = None
 
         if knight.is_invisible and move.power > 0:
             knight.is_invisible = False
             knight.active_effects.pop("invisible", None)
-            self.log.append(f"{knight.name} reappeared!")
+            self.log.emit(battle_log.REAPPEAR, knight.name)
 
-        if move.power > 0 and "cursed" in knight.status_effects:
+        if move.power > 0 and knight.status_effects.mask & CURSED:
             curse_damage = knight.max_hp * 0.2
             knight.hp -= curse_damage
-            self.log.append(f"{knight.name} feels shadows claw at their mind!")
+            self.log.emit(battle_log.CURSE_DAMAGE, knight.name)
 
         if move.name == "Mists of Borealis":
             if self.current_weather["type"] != "Hailstorm":
-                self.log.append(
-                    f"{knight.name} attempted {move.name}... but it failed!"
-                )
+                self.log.emit(battle_log.MOVE_FAILED, knight.name, move.name)
                 return
 
         if move.is_protection_move:
             fail_chance = 1 - (0.5**knight.consecutive_protects)
-            if random.random() < fail_chance:
-                self.log.append(f"{knight.name} uses {move.name}... but it failed!")
+            if self.rng.random() < fail_chance:
+                self.log.emit(battle_log.PROTECT_FAILED, knight.name, move.name)
                 knight.consecutive_protects = 0
                 return
             knight.consecutive_protects += 1
@@ -663,19 +969,18 @@ class Battle:
 
         if move.name == "Parry":
             knight.is_parrying = True
-            self.log.append(f"{knight.name} takes a stance, ready to parry!")
-            self.log += knight.apply_self_effect(move.self_effect)
+            self.log.emit(battle_log.PARRY_STANCE, knight.name)
+            knight.apply_self_effect(move.self_effect_op)
             return
 
         if move.name == "Royal Aegis":
             knight.is_aegis_protected = True
-            self.log.append(f"{knight.name} raises its shield!")
+            self.log.emit(battle_log.AEGIS_RAISED, knight.name)
             return
 
-        owner = self.p1 if knight in self.p1.active_knights else self.p2
         if move.name == "Shield Wall":
-            owner.is_aoe_protected = True
-            self.log.append(f"{knight.name} creates a protective wall for the team!")
+            knight.owner.is_aoe_protected = True
+            self.log.emit(battle_log.SHIELD_WALL, knight.name)
             return
 
         if not isinstance(targets, list):
@@ -684,7 +989,7 @@ class Battle:
         if move.target_type == "team_synergy":
             ally = next((k for k in targets if k != knight), None)
             if ally and ally.faction == knight.faction:
-                self.log.append(f"{knight.name} and {ally.name} resonate with synergy!")
+                self.log.emit(battle_log.SYNERGY, knight.name, ally.name)
                 for member in targets:
                     if member:
                         self.apply_move_effect(knight, move, member, synergy_move=False)
@@ -700,57 +1005,45 @@ class Battle:
     def apply_move_effect(
         self, attacker: Knight, move: Move, target: Knight, synergy_move=True
     ):
-        if random.random() * 100 > move.accuracy:
-            self.log.append(f"{attacker.name}'s {move.name} missed!")
+        if self.rng.random() * 100 > move.accuracy:
+            self.log.emit(battle_log.MISS, attacker.name, move.name)
             return
 
         if target.is_invisible and move.target_type == "single_enemy":
-            self.log.append(f"{attacker.name}'s attack missed {target.name}!")
+            self.log.emit(battle_log.MISS_INVISIBLE, attacker.name, target.name)
             return
 
-        owner_of_target = self.p1 if target in self.p1.active_knights else self.p2
         if (
             move.target_type in ["all_enemies", "all_adjacent"]
-            and owner_of_target.is_aoe_protected
-            and target in owner_of_target.active_knights
+            and target.slot is not None
+            and target.owner.is_aoe_protected
         ):
-            self.log.append(
-                f"The attack on {target.name} was blocked by a Shield Wall!"
-            )
+            self.log.emit(battle_log.SHIELD_WALL_BLOCK, target.name)
             return
 
         if target.is_parrying:
-            self.log.append(
-                f"{attacker.name}'s attack hit {target.name}... but struck their guard!"
-            )
+            self.log.emit(battle_log.PARRIED, attacker.name, target.name)
             attacker.disabled_moves[move.name] = 2
-            self.log.append(f"{attacker.name}'s {move.name} is disabled!")
+            self.log.emit(battle_log.MOVE_DISABLED, attacker.name, move.name)
             return
 
         if target.is_aegis_protected:
-            self.log.append(
-                f"{attacker.name}'s attack was blocked by {target.name}'s Royal Aegis!"
-            )
+            self.log.emit(battle_log.AEGIS_BLOCK, attacker.name, target.name)
             if move.power > 0:
-                nlog = attacker.apply_status("weaken", 2, attacker=target)
-                if nlog:
-                    if not isinstance(nlog, list):
-                        nlog = [nlog]
-                    self.log += nlog
+                attacker.apply_status("weaken", 2, attacker=target)
             return
         if synergy_move:
-            self.log.append(f"{attacker.name} uses {move.name} on {target.name}!")
-        if not SILENT_MODE:
+            self.log.emit(battle_log.MOVE_USED, attacker.name, move.name, target.name)
+        if not self.silent:
             time.sleep(1)
 
         if move.name == "Bulwark Charge":
             damage = int(attacker.last_damage_taken * 1.5)
             if damage > 0:
-                dealt, nlog = target.take_damage(damage, move)
-                self.log += nlog
-                self.log.append(f"It dealt {dealt} damage to {target.name}!")
+                dealt = target.take_damage(damage, move)
+                self.log.emit(battle_log.DAMAGE, dealt, target.name)
             else:
-                self.log.append("...but it failed!")
+                self.log.emit(battle_log.FAILED)
             return
 
         if move.name == "Heavenly Blessing":
@@ -758,85 +1051,76 @@ class Battle:
             if self.current_weather["type"] == "Blazing Sun":
                 heal_amount = int(target.max_hp * 0.50)
             target.hp = min(target.max_hp, target.hp + heal_amount)
-            self.log.append(
-                f"{target.name} was blessed with heavenly light and recovered health!"
-            )
+            self.log.emit(battle_log.HEAL, target.name)
             return
 
         if move.power > 0:
-            damage = (attacker.attack * move.power) // target.defense
-            dealt, nlog = target.take_damage(damage, move)
-            self.log += nlog
+            # Stat stages of -4 or lower can take Defense to zero or below.
+            damage = (attacker.attack * move.power) // max(1, target.defense)
+            dealt = target.take_damage(damage, move)
             if dealt > 0:
-                self.log.append(f"It dealt {dealt} damage to {target.name}!")
+                self.log.emit(battle_log.DAMAGE, dealt, target.name)
                 if (
-                    "consecration" in target.active_effects
+                    target.active_effects.mask & CONSECRATION
                     and move.target_type == "single_enemy"
                 ):
-                    nlog = attacker.apply_status("burned", 3, attacker=target)
-                    if nlog:
-                        if not isinstance(nlog, list):
-                            nlog = [nlog]
-                        self.log += nlog
-                if target.ability.name == "Soul Ablaze" and random.random() < 0.3:
-                    status_msg = attacker.apply_status("burned", 3, attacker=target)
-                    if status_msg:
-                        if "is already burned" in status_msg:
-                            self.log.append(status_msg)
-                        else:
-                            self.log.append(
-                                f"{attacker.name} was burned by {target.name}'s Soul Ablaze!"
-                            )
+                    attacker.apply_status("burned", 3, attacker=target)
+                if target.ability.name == "Soul Ablaze" and self.rng.random() < 0.3:
+                    if attacker.apply_status(
+                        "burned", 3, attacker=target, announce=False
+                    ):
+                        self.log.emit(
+                            battle_log.SOUL_ABLAZE, attacker.name, target.name
+                        )
+                    else:
+                        self.log.emit(
+                            battle_log.STATUS_ALREADY, attacker.name, "burned"
+                        )
 
         if move.effect:
-            if random.random() <= (move.effect_chance / 100):
-                nlog = target.apply_status(
-                    move.effect, move.effect_duration, attacker=attacker
+            if self.rng.random() <= (move.effect_chance / 100):
+                target.apply_effect(
+                    move.effect_op, move.effect_duration, attacker=attacker
                 )
-                if nlog:
-                    if not isinstance(nlog, list):
-                        nlog = [nlog]
-                    self.log += nlog
 
         if move.sets_weather:
-            self.current_weather["type"] = move.sets_weather
-            self.current_weather["turns_left"] = 5
-            self.log.append(f"The weather changed to {move.sets_weather}!")
+            self.set_weather(move.sets_weather, 5)
+            self.log.emit(battle_log.WEATHER_SET, move.sets_weather)
 
         if move.self_effect:
-            self.log += attacker.apply_self_effect(move.self_effect)
+            attacker.apply_self_effect(move.self_effect_op)
 
         if move.synergy_effect:
             target.active_effects[move.synergy_effect] = move.effect_duration
             if move.synergy_effect == "invisible":
                 target.is_invisible = True
-            self.log.append(
-                f"{target.name} is now affected by {move.synergy_effect.replace('_', ' ')}!"
-            )
+            self.log.emit(battle_log.SYNERGY_EFFECT, target.name, move.synergy_effect)
 
     def process_fainted(self):
         for player in [self.p1, self.p2]:
             for i, knight in enumerate(player.active_knights):
                 if knight and knight.is_fainted:
                     self.display_battlefield()
-                    self.log.append(f"{knight.name} has fainted!")
-                    if not SILENT_MODE:
+                    self.log.emit(battle_log.FAINTED, knight.name)
+                    if not self.silent:
                         time.sleep(1)
                     player.active_knights[i] = None
                     if player.has_living_knights():
                         self.choose_knight_for_slot(player, i)
                     else:
-                        self.log.append(f"{player.name} has no more knights!")
+                        self.log.emit(battle_log.TEAM_DEFEATED, player.name)
 
     def end_of_round_effects(self):
-        self.log.append("--- End of Round ---")
+        self.log.emit(battle_log.ROUND_END)
         if self.current_weather["turns_left"] > 0:
             self.current_weather["turns_left"] -= 1
             if self.current_weather["turns_left"] == 0:
-                self.log.append(f"The {self.current_weather['type']} subsided.")
-                self.current_weather["type"] = "Clear"
+                self.log.emit(battle_log.WEATHER_END, self.current_weather["type"])
+                self.set_weather("Clear", 0)
             else:
-                self.log.append(f"The {self.current_weather['type']} continues...")
+                self.log.emit(
+                    battle_log.WEATHER_CONTINUES, self.current_weather["type"]
+                )
 
         all_knights = [
             k
@@ -844,29 +1128,58 @@ class Battle:
             if k and not k.is_fainted
         ]
         for knight in all_knights:
-            if "burned" in knight.status_effects:
+            if knight.status_effects.mask & BURNED:
                 burn_damage = int(knight.max_hp * 0.15)
                 knight.hp -= burn_damage
-                self.log.append(f"{knight.name} was hurt by its burn!")
+                self.log.emit(battle_log.BURN_DAMAGE, knight.name)
 
-            if "dazed" in knight.status_effects:
-                if random.random() < 0.5:
+            if knight.status_effects.mask & DAZED:
+                if self.rng.random() < 0.5:
                     del knight.status_effects["dazed"]
-                    self.log.append(f"{knight.name} shook off the daze!")
+                    knight.invalidate_stats()
+                    self.log.emit(battle_log.DAZE_CLEARED, knight.name)
 
-            self.log += knight.tick_statuses()
+            knight.tick_statuses()
 
     def announce_winner(self):
-        clear_screen()
+        clear_screen(self.silent)
         winner = self.p1.name if self.p1.has_living_knights() else self.p2.name
-        type_text(f"{winner} is the winner!", delay=0.05)
-        if not SILENT_MODE:
+        type_text(f"{winner} is the winner!", delay=0.05, silent=self.silent)
+        if not self.silent:
             print("\n--- Battle Over ---")
 
 
+class Warband:
+    """A team compiled once from its JSON data. Every entry is checked
+    against the game data up front; knights() then hands out fresh copies
+    of the team for each battle."""
+
+    def __init__(self, team_data):
+        if not team_data:
+            raise ValueError("A warband needs at least one knight")
+        self.prototypes = []
+        for knight_info in team_data:
+            try:
+                self.prototypes.append(Knight(knight_info))
+            except KeyError as e:
+                name = knight_info.get("custom_name", "?")
+                raise ValueError(f"Unknown {e} in knight {name!r}") from None
+
+    @classmethod
+    def from_file(cls, file_path):
+        with open(file_path, "r") as f:
+            return cls(json.load(f))
+
+    def knights(self):
+        return [knight.clone() for knight in self.prototypes]
+
+    def __len__(self):
+        return len(self.prototypes)
+
+
 def decode_team_from_json(team_data):
     try:
-        return [Knight(knight_info) for knight_info in team_data]
+        return Warband(team_data).knights()
     except Exception as e:
         if not SILENT_MODE:
             print(f"Error decoding team data: {e}")
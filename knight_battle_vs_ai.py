@@ -11,6 +11,7 @@ import sys
 script_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, script_dir)
 
+import battle_log
 from gamedata import ALL_KNIGHTS, ALL_MOVES, ALL_ABILITIES, Move
 from knight_battle_game import (
     Battle,
@@ -20,7 +21,12 @@ from knight_battle_game import (
     clear_screen,
     type_text,
 )
-from AI_Zone.knight_ai_player import AIPlayer  # This import will now work correctly
+from AI_Zone.knight_ai_player import (  # This import will now work correctly
+    AIBrain,
+    AIPlayer,
+)
+
+SERVING_EXPLORATION_LIMIT = 10000
 
 
 class BattleVsAI(Battle):
@@ -58,7 +64,7 @@ class BattleVsAI(Battle):
         all_knights.sort(key=lambda k: k.speed, reverse=True)
 
         for knight in all_knights:
-            owner = self.p1 if knight in self.p1.active_knights else self.p2
+            owner = knight.owner
 
             if owner == self.p1:  # Human Player
                 opponent_player = self.p2
@@ -84,11 +90,8 @@ class BattleVsAI(Battle):
                 move, target = details
                 actions.append((knight, move, target))
             elif action == "switch":
-                slot = owner.active_knights.index(knight)
-                owner.active_knights[slot] = details
-                self.log.append(
-                    f"{owner.name} recalls {knight.name} and sends out {details.name}!"
-                )
+                owner.active_knights[knight.slot] = details
+                self.log.emit(battle_log.SWITCH, owner.name, knight.name, details.name)
                 time.sleep(1)
 
         return actions
@@ -101,7 +104,7 @@ class BattleVsAI(Battle):
             for i, knight in enumerate(player.active_knights):
                 if knight and knight.is_fainted:
                     self.display_battlefield()
-                    self.log.append(f"{knight.name} has fainted!")
+                    self.log.emit(battle_log.FAINTED, knight.name)
                     time.sleep(1)
                     player.active_knights[i] = None
                     if player.has_living_knights():
@@ -116,12 +119,12 @@ class BattleVsAI(Battle):
                                 time.sleep(1)
                                 new_knight = benched[0]
                                 player.active_knights[i] = new_knight
-                                self.log.append(
-                                    f"{player.name} sends out {new_knight.name}!"
+                                self.log.emit(
+                                    battle_log.SENDS_OUT, player.name, new_knight.name
                                 )
                                 time.sleep(1)
                     else:
-                        self.log.append(f"{player.name} has no more knights!")
+                        self.log.emit(battle_log.TEAM_DEFEATED, player.name)
 
 
 if __name__ == "__main__":
@@ -138,11 +141,15 @@ if __name__ == "__main__":
     # Setup AI Player
     ai_folder_path = os.path.join(script_dir, "AI_Zone")
     ai_team_path = os.path.join(ai_folder_path, "ai_opponent_team.json")
-    ai_brain_path = os.path.join(ai_folder_path, "ai_brain.json")
+    ai_brain_path = os.path.join(ai_folder_path, "ai_brain.db")
+    if not os.path.exists(ai_brain_path):
+        ai_brain_path = os.path.join(ai_folder_path, "ai_brain.json")
 
     ai_player_obj = AIPlayer("Knightfall AI", ai_team_path)
-    ai_player_obj.brain.brain_file = ai_brain_path
-    ai_player_obj.brain.knowledge = ai_player_obj.brain.load_knowledge()
+    # Frozen: unseen states are tried from a bounded buffer, never learned
+    ai_player_obj.brain = AIBrain(
+        ai_brain_path, frozen=True, exploration_limit=SERVING_EXPLORATION_LIMIT
+    )
 
     player2 = ai_player_obj.player
     player2.ai_logic = ai_player_obj
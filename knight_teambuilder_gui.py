@@ -2,7 +2,6 @@ import tkinter as tk
 from tkinter import ttk, messagebox, font, filedialog
 import json
 import os
-import copy
 from gamedata import ALL_KNIGHTS, ALL_MOVES, ALL_ABILITIES
 
 
@@ -229,7 +228,7 @@ class TeamBuilderApp:
         stats_frame = ttk.LabelFrame(left_custom_frame, text="Stats (50 Bonus Points)")
         stats_frame.pack(pady=5, fill="x")
         self.stat_vars = {}
-        self.base_stats = copy.deepcopy(template.base_stats)
+        self.base_stats = dict(template.base_stats)
         self.points_remaining = 50
         self.points_label = ttk.Label(
             stats_frame, text=f"Points Remaining: {self.points_remaining}"
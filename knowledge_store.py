@@ -0,0 +1,205 @@
+import argparse
+import json
+import os
+import sqlite3
+import sys
+from collections.abc import MutableMapping
+
+# Add the script's directory to the Python path
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(script_dir)
+
+# --- On-Disk Knowledge ---
+#
+# Long training runs produce brains with millions of states. SQLiteKnowledge
+# keeps them in an SQLite file that is memory-mapped and read one state at a
+# time, so opening a brain is instant and only the states a battle visits
+# are ever loaded. Writes are upserts, committed in batches.
+
+DB_SUFFIXES = (".db", ".sqlite", ".sqlite3")
+MMAP_SIZE = 1 << 30
+
+_SIGN_BIT = 1 << 63
+_WRAP = 1 << 64
+
+
+def _to_row(key):
+    # State hashes are unsigned 64-bit; SQLite integers are signed.
+    return key - _WRAP if key >= _SIGN_BIT else key
+
+
+def _from_row(key):
+    return key + _WRAP if key < 0 else key
+
+
+def is_store_path(path):
+    return str(path).endswith(DB_SUFFIXES)
+
+
+class SQLiteKnowledge(MutableMapping):
+    """AIBrain knowledge (state hash -> move name) stored in an SQLite file."""
+
+    def __init__(self, path, commit_every=10000):
+        self.path = path
+        self.commit_every = commit_every
+        self.pending = 0
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS knowledge (state INTEGER PRIMARY KEY, move TEXT)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)"
+        )
+        self.conn.commit()
+
+    def get_meta(self, name):
+        """A JSON value stored alongside the knowledge, or None."""
+        row = self.conn.execute(
+            "SELECT value FROM meta WHERE name = ?", (name,)
+        ).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def set_meta(self, name, value):
+        if value is None:
+            self.conn.execute("DELETE FROM meta WHERE name = ?", (name,))
+        else:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)",
+                (name, json.dumps(value)),
+            )
+        self._written(1)
+
+    def get(self, key, default=None):
+        row = self.conn.execute(
+            "SELECT move FROM knowledge WHERE state = ?", (_to_row(key),)
+        ).fetchone()
+        return default if row is None else row[0]
+
+    def __getitem__(self, key):
+        row = self.conn.execute(
+            "SELECT move FROM knowledge WHERE state = ?", (_to_row(key),)
+        ).fetchone()
+        if row is None:
+            raise KeyError(key)
+        return row[0]
+
+    def __contains__(self, key):
+        row = self.conn.execute(
+            "SELECT 1 FROM knowledge WHERE state = ?", (_to_row(key),)
+        ).fetchone()
+        return row is not None
+
+    def __setitem__(self, key, move_name):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO knowledge (state, move) VALUES (?, ?)",
+            (_to_row(key), move_name),
+        )
+        self._written(1)
+
+    def __delitem__(self, key):
+        cursor = self.conn.execute(
+            "DELETE FROM knowledge WHERE state = ?", (_to_row(key),)
+        )
+        if cursor.rowcount == 0:
+            raise KeyError(key)
+        self._written(1)
+
+    def __iter__(self):
+        cursor = self.conn.execute("SELECT state FROM knowledge")
+        return (_from_row(state) for (state,) in cursor)
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM knowledge").fetchone()[0]
+
+    def items(self):
+        cursor = self.conn.execute("SELECT state, move FROM knowledge")
+        return ((_from_row(state), move) for state, move in cursor)
+
+    def update(self, other=(), **kwargs):
+        items = other.items() if hasattr(other, "items") else other
+        rows = [
+            (_to_row(key), move_name)
+            for key, move_name in items
+            if move_name is not None
+        ]
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO knowledge (state, move) VALUES (?, ?)", rows
+        )
+        self._written(len(rows))
+
+    def drop_empty(self):
+        """Delete states stored without a move; returns how many there were."""
+        cursor = self.conn.execute("DELETE FROM knowledge WHERE move IS NULL")
+        self._written(cursor.rowcount)
+        return cursor.rowcount
+
+    def clear(self):
+        self.conn.execute("DELETE FROM knowledge")
+        self._written(1)
+
+    def _written(self, count):
+        self.pending += count
+        if self.pending >= self.commit_every:
+            self.commit()
+
+    def commit(self):
+        self.conn.commit()
+        self.pending = 0
+
+    def close(self):
+        self.commit()
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# --- JSON Import / Export ---
+def import_json(json_path, db_path):
+    """Copy a JSON brain file into an SQLite store; returns the state count."""
+    from knight_ai_training import AIBrain, DEFAULT_LEVELS, LEVELS_KEY
+
+    brain = AIBrain(json_path)
+    with SQLiteKnowledge(db_path) as store:
+        if brain.levels != DEFAULT_LEVELS:
+            store.set_meta(LEVELS_KEY, brain.level_names())
+        store.update(brain.knowledge)
+    return len(brain.knowledge)
+
+
+def export_json(db_path, json_path):
+    """Write an SQLite store out in the JSON brain format, one state at a time."""
+    from knight_ai_training import LEVELS_KEY
+
+    count = 0
+    with SQLiteKnowledge(db_path) as store, open(json_path, "w") as f:
+        f.write("{")
+        levels = store.get_meta(LEVELS_KEY)
+        if levels:
+            f.write(f'\n    "{LEVELS_KEY}": {json.dumps(levels)}')
+        for key, move_name in store.items():
+            f.write(",\n" if count or levels else "\n")
+            f.write(f'    "{key}": {json.dumps(move_name)}')
+            count += 1
+        f.write("\n}" if count or levels else "}")
+    return count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Convert AI brains between JSON and SQLite."
+    )
+    parser.add_argument("command", choices=("import", "export"))
+    parser.add_argument("source")
+    parser.add_argument("destination")
+    args = parser.parse_args()
+
+    if args.command == "import":
+        count = import_json(args.source, args.destination)
+    else:
+        count = export_json(args.source, args.destination)
+    print(f"Copied {count} states from {args.source} to {args.destination}")
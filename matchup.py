@@ -0,0 +1,655 @@
+import argparse
+import csv
+import json
+import math
+import os
+import sys
+import time
+from collections import deque
+from itertools import combinations
+from multiprocessing import Pool
+from queue import SimpleQueue
+
+# Add the script's directory to the Python path
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(script_dir)
+
+from battle_rng import AntitheticRandom, SeedStream
+from headless_battle import HeadlessBattle
+from knight_battle_game import Player, Warband
+from knight_ai_training import AIBrain, RandomPolicy
+
+# --- Matchup Simulator ---
+#
+# Plays every pairing of a set of entrants against each other with
+# HeadlessBattle, spread over worker processes, and reports each entrant's
+# win rate against each other one with a Wilson 95% interval, plus average
+# turns and survivors. An entrant is a team file, optionally played by its
+# own AI brain ("team.json@brain.json"). Pairings alternate which entrant
+# is player 1 from chunk to chunk. Battle seeds are drawn up front and
+# results are applied in order, so they only depend on --seed, not on the
+# worker count.
+#
+# With a SequentialTest a pairing stops as soon as the test decides which
+# entrant is better, instead of playing all its battles.
+#
+# compare_paired() instead measures how much better candidate A does than
+# candidate B against the same opponents, playing both on the same battle
+# seeds (common random numbers), optionally each also on its mirrored
+# random stream (antithetic pairs).
+
+CHUNK_SIZE = 50  # Battles per task; pairings report as their chunks finish
+SEQUENTIAL_CHUNK_SIZE = 10  # Smaller, so little is played past a decision
+Z_95 = 1.959964
+
+_warbands = None
+_policies = None
+
+
+def team_name(path):
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def parse_entrant(spec, brain_file=None):
+    """(name, team path, brain path or None) for "team.json[@brain.json]"."""
+    team_path, _, brain_path = spec.partition("@")
+    brain_path = brain_path or brain_file
+    name = team_name(team_path)
+    if "@" in spec:
+        name = f"{name}@{team_name(brain_path)}"
+    return name, team_path, brain_path
+
+
+def wilson_interval(wins, n, z=Z_95):
+    if n == 0:
+        return 0.0, 1.0
+    p = wins / n
+    denom = 1 + z * z / n
+    centre = (p + z * z / (2 * n)) / denom
+    half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denom
+    return max(0.0, centre - half), min(1.0, centre + half)
+
+
+class SequentialTest:
+    """Wald's sequential probability ratio test on decisive battles: does
+    team_a win at most 0.5 - margin of them (H0), or at least 0.5 + margin
+    (H1)? alpha and beta are the chances of wrongly accepting H1 and H0.
+    Draws carry no evidence either way."""
+
+    def __init__(self, margin=0.05, alpha=0.05, beta=0.05):
+        if not 0 < margin < 0.5:
+            raise ValueError("margin must be between 0 and 0.5")
+        p0, p1 = 0.5 - margin, 0.5 + margin
+        self.margin, self.alpha, self.beta = margin, alpha, beta
+        self.win_step = math.log(p1 / p0)
+        self.loss_step = math.log((1 - p1) / (1 - p0))
+        self.upper = math.log((1 - beta) / alpha)
+        self.lower = math.log(beta / (1 - alpha))
+
+    def step(self, result):
+        """Log-likelihood ratio change for one battle result."""
+        if result == 1:
+            return self.win_step
+        if result == -1:
+            return self.loss_step
+        return 0.0
+
+    def decide(self, llr):
+        """1 if team_a is better, -1 if team_b is, 0 to keep playing."""
+        if llr >= self.upper:
+            return 1
+        if llr <= self.lower:
+            return -1
+        return 0
+
+
+def init_worker(entrants):
+    global _warbands, _policies
+    _warbands = {name: Warband.from_file(path) for name, path, _ in entrants}
+    brains = {}
+    _policies = {}
+    for name, _, brain_path in entrants:
+        if brain_path and brain_path not in brains:
+            brains[brain_path] = AIBrain(brain_path, frozen=True)
+        _policies[name] = brains.get(brain_path)
+
+
+def policy(name):
+    brain = _policies[name]
+    return brain if brain is not None else RandomPolicy()
+
+
+def play_battle(first, second, seed, antithetic=False):
+    p1 = Player(first, _warbands[first].knights())
+    p1.ai_logic = policy(first)
+    p2 = Player(second, _warbands[second].knights())
+    p2.ai_logic = policy(second)
+    rng = AntitheticRandom(seed) if antithetic else None
+    return HeadlessBattle(p1, p2, seed=seed, rng=rng).run_simulation()
+
+
+def play_chunk(task):
+    """Play team_a against team_b once per seed. Returns the pairing and one
+    (result, team_a survivors, team_b survivors, turns) per battle, where
+    result is 1 for a team_a win, -1 for a loss and 0 for a draw."""
+    team_a, team_b, chunk, a_first, seeds = task
+    outcomes = []
+    for seed in seeds:
+        first, second = (team_a, team_b) if a_first else (team_b, team_a)
+        log = play_battle(first, second, seed)
+        a_survivors, b_survivors = log["p1_survivors"], log["p2_survivors"]
+        if not a_first:
+            a_survivors, b_survivors = b_survivors, a_survivors
+        result = 0
+        if log["winner"] == team_a:
+            result = 1
+        elif log["winner"] == team_b:
+            result = -1
+        outcomes.append((result, a_survivors, b_survivors, log["turns"]))
+    return team_a, team_b, chunk, outcomes
+
+
+class MatchupStats:
+    """Running totals for one pairing, from team_a's side."""
+
+    def __init__(self, team_a, team_b, test=None):
+        self.team_a, self.team_b = team_a, team_b
+        self.test = test
+        self.llr = 0.0
+        self.decision = 0
+        self.battles = self.wins = self.losses = 0
+        self.turns = self.a_survivors = self.b_survivors = 0
+
+    def add(self, outcomes):
+        """Count battles in order, stopping once the test has decided."""
+        for result, a_survivors, b_survivors, turns in outcomes:
+            if self.decision:
+                break
+            if self.test is not None:
+                self.llr += self.test.step(result)
+                self.decision = self.test.decide(self.llr)
+            self.battles += 1
+            self.wins += result == 1
+            self.losses += result == -1
+            self.a_survivors += a_survivors
+            self.b_survivors += b_survivors
+            self.turns += turns
+
+    def rows(self):
+        """One row per side of the pairing."""
+        n = self.battles
+        draws = n - self.wins - self.losses
+        for team, opponent, wins, losses, mine, theirs, decision in (
+            (
+                self.team_a,
+                self.team_b,
+                self.wins,
+                self.losses,
+                self.a_survivors,
+                self.b_survivors,
+                self.decision,
+            ),
+            (
+                self.team_b,
+                self.team_a,
+                self.losses,
+                self.wins,
+                self.b_survivors,
+                self.a_survivors,
+                -self.decision,
+            ),
+        ):
+            low, high = wilson_interval(wins, n)
+            row = {
+                "team": team,
+                "opponent": opponent,
+                "battles": n,
+                "wins": wins,
+                "draws": draws,
+                "losses": losses,
+                "win_rate": wins / n if n else 0.0,
+                "ci_low": low,
+                "ci_high": high,
+                "avg_turns": self.turns / n if n else 0.0,
+                "avg_survivors": mine / n if n else 0.0,
+                "avg_opponent_survivors": theirs / n if n else 0.0,
+            }
+            if self.test is not None:
+                row["verdict"] = VERDICTS[decision]
+            yield row
+
+
+VERDICTS = {1: "better", -1: "worse", 0: "inconclusive"}
+
+
+def format_row(row, width=12):
+    return (
+        f"{row['team']:>{width}} vs {row['opponent']:<{width}} "
+        f"win {row['win_rate']:.3f} [{row['ci_low']:.3f}, {row['ci_high']:.3f}] "
+        f"draw {row['draws'] / row['battles']:.3f} | "
+        f"turns {row['avg_turns']:.1f} | "
+        f"survivors {row['avg_survivors']:.2f}/{row['avg_opponent_survivors']:.2f}"
+        + (f" | {row['verdict']} after {row['battles']}" if "verdict" in row else "")
+    )
+
+
+def format_matrix(teams, rows):
+    """Win rate of each row team against each column team."""
+    rates = {(row["team"], row["opponent"]): row["win_rate"] for row in rows}
+    width = max(8, max(len(team) for team in teams) + 1)
+    lines = [" " * width + "".join(f"{team:>{width}}" for team in teams)]
+    for team in teams:
+        cells = "".join(
+            f"{'-':>{width}}" if team == other else f"{rates[team, other]:>{width}.3f}"
+            for other in teams
+        )
+        lines.append(f"{team:<{width}}" + cells)
+    return "\n".join(lines)
+
+
+def plan_tasks(teams, battles, seed, chunk_size=CHUNK_SIZE):
+    """Chunks of (team_a, team_b, chunk index, team_a is player 1, seeds),
+    pairing by pairing."""
+    seed_stream = SeedStream(seed)
+    tasks = []
+    for team_a, team_b in combinations(teams, 2):
+        seeds = seed_stream.take(battles)
+        for chunk, i in enumerate(range(0, battles, chunk_size)):
+            tasks.append(
+                (team_a, team_b, chunk, chunk % 2 == 0, seeds[i : i + chunk_size])
+            )
+    return tasks
+
+
+def run_matchups(
+    entrants,
+    battles,
+    seed=None,
+    workers=None,
+    test=None,
+    on_pairing=None,
+):
+    """Play every pairing of entrants, (name, team path, brain path or None)
+    tuples, up to `battles` times each; with a SequentialTest, only until it
+    decides. Returns one row per (team, opponent); on_pairing(rows) is
+    called as each pairing finishes."""
+    teams = [name for name, _, _ in entrants]
+    if len(set(teams)) != len(teams):
+        raise ValueError("Entrants must have distinct names")
+    chunk_size = CHUNK_SIZE if test is None else SEQUENTIAL_CHUNK_SIZE
+    pending = deque(plan_tasks(teams, battles, seed, chunk_size))
+    stats = {pair: MatchupStats(*pair, test=test) for pair in combinations(teams, 2)}
+    remaining = {pair: 0 for pair in stats}
+    for team_a, team_b, _, _, _ in pending:
+        remaining[team_a, team_b] += 1
+    next_chunk = dict.fromkeys(stats, 0)
+    early = {pair: {} for pair in stats}  # Chunks that finished out of order
+    finished = set()
+
+    def finish(pair):
+        finished.add(pair)
+        if on_pairing:
+            on_pairing(list(stats[pair].rows()))
+
+    def apply(team_a, team_b, chunk, outcomes):
+        pair = (team_a, team_b)
+        if pair in finished:
+            return
+        early[pair][chunk] = outcomes
+        while next_chunk[pair] in early[pair]:
+            stats[pair].add(early[pair].pop(next_chunk[pair]))
+            next_chunk[pair] += 1
+            remaining[pair] -= 1
+            if stats[pair].decision or remaining[pair] == 0:
+                finish(pair)
+                return
+
+    def next_task():
+        # Decided pairings' chunks are never played
+        while pending:
+            task = pending.popleft()
+            if (task[0], task[1]) not in finished:
+                return task
+        return None
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        init_worker(entrants)
+        while (task := next_task()) is not None:
+            apply(*play_chunk(task))
+    else:
+        # A few chunks in flight per worker, so a decision stops a pairing
+        # without waiting for its whole queue
+        results = SimpleQueue()
+        in_flight = 0
+        with Pool(workers, initializer=init_worker, initargs=(entrants,)) as pool:
+            while True:
+                while in_flight < workers * 2 and (task := next_task()) is not None:
+                    pool.apply_async(
+                        play_chunk,
+                        (task,),
+                        callback=results.put,
+                        error_callback=results.put,
+                    )
+                    in_flight += 1
+                if in_flight == 0:
+                    break
+                result = results.get()
+                in_flight -= 1
+                if isinstance(result, BaseException):
+                    raise result
+                apply(*result)
+
+    return [row for pair in stats.values() for row in pair.rows()]
+
+
+# --- Paired Comparison ---
+def score(log, name):
+    """1 for a win, 0.5 for a draw, 0 for a loss."""
+    if log["winner"] is None:
+        return 0.5
+    return 1.0 if log["winner"] == name else 0.0
+
+
+def play_paired_chunk(task):
+    """Play both candidates against the opponent on each seed, in the same
+    seat, and also on the mirrored stream if antithetic. Returns each
+    seed's (candidate_a scores, candidate_b scores)."""
+    candidate_a, candidate_b, opponent, seeds, antithetic = task
+    streams = (False, True) if antithetic else (False,)
+    results = []
+    for i, seed in enumerate(seeds):
+        scores = []
+        for candidate in (candidate_a, candidate_b):
+            candidate_scores = []
+            for mirrored in streams:
+                if i % 2 == 0:
+                    log = play_battle(candidate, opponent, seed, mirrored)
+                else:
+                    log = play_battle(opponent, candidate, seed, mirrored)
+                candidate_scores.append(score(log, candidate))
+            scores.append(candidate_scores)
+        results.append(tuple(scores))
+    return results
+
+
+def mean_and_variance(values):
+    n = len(values)
+    mean = sum(values) / n
+    variance = sum((v - mean) ** 2 for v in values) / (n - 1) if n > 1 else 0.0
+    return mean, variance
+
+
+def paired_summary(opponent, results):
+    """Mean score of each candidate and their paired difference. se is the
+    standard error of the mean per-seed difference; independent_se is what
+    the same number of battles would give with fresh randomness for every
+    battle, and their squared ratio is how many times fewer battles the
+    paired design needs for the same precision."""
+    seeds = len(results)
+    battles = sum(len(a) for a, _ in results)
+    mean_a, var_a = mean_and_variance([x for a, _ in results for x in a])
+    mean_b, var_b = mean_and_variance([x for _, b in results for x in b])
+    diff, var_diff = mean_and_variance(
+        [sum(a) / len(a) - sum(b) / len(b) for a, b in results]
+    )
+    se = math.sqrt(var_diff / seeds)
+    independent_se = math.sqrt((var_a + var_b) / battles)
+    return {
+        "opponent": opponent,
+        "seeds": seeds,
+        "battles": battles,
+        "score_a": mean_a,
+        "score_b": mean_b,
+        "difference": diff,
+        "se": se,
+        "ci_low": diff - Z_95 * se,
+        "ci_high": diff + Z_95 * se,
+        "independent_se": independent_se,
+        "variance_reduction": (independent_se / se) ** 2 if se > 0 else math.inf,
+    }
+
+
+def combine_summaries(summaries):
+    """The average over opponents, each weighted equally. Standard errors
+    combine per opponent, so differences between opponents, which every
+    design plays equally, do not count as noise."""
+    k = len(summaries)
+    combined = {"opponent": "all"}
+    for field in ("seeds", "battles"):
+        combined[field] = sum(s[field] for s in summaries)
+    for field in ("score_a", "score_b", "difference"):
+        combined[field] = sum(s[field] for s in summaries) / k
+    for field in ("se", "independent_se"):
+        combined[field] = math.sqrt(sum(s[field] ** 2 for s in summaries)) / k
+    se, independent_se = combined["se"], combined["independent_se"]
+    combined["ci_low"] = combined["difference"] - Z_95 * se
+    combined["ci_high"] = combined["difference"] + Z_95 * se
+    combined["variance_reduction"] = (independent_se / se) ** 2 if se > 0 else math.inf
+    return combined
+
+
+def compare_paired(
+    candidate_a,
+    candidate_b,
+    opponents,
+    battles,
+    seed=None,
+    workers=None,
+    antithetic=False,
+):
+    """Score candidates A and B, entrant tuples as for run_matchups, against
+    each opponent in `battles` battles each, on the same seeds; with
+    antithetic, half as many seeds, each also played mirrored. Returns one
+    summary per opponent and, with several, one over all of them."""
+    entrants = [candidate_a, candidate_b, *opponents]
+    names = [name for name, _, _ in entrants]
+    if len(set(names)) != len(names):
+        raise ValueError("Candidates and opponents must have distinct names")
+    seed_stream = SeedStream(seed)
+    seeds_per_opponent = battles // 2 if antithetic else battles
+    tasks = []
+    for opponent, _, _ in opponents:
+        seeds = seed_stream.take(seeds_per_opponent)
+        for i in range(0, len(seeds), CHUNK_SIZE):
+            tasks.append(
+                (names[0], names[1], opponent, seeds[i : i + CHUNK_SIZE], antithetic)
+            )
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        init_worker(entrants)
+        results = list(map(play_paired_chunk, tasks))
+    else:
+        with Pool(workers, initializer=init_worker, initargs=(entrants,)) as pool:
+            results = pool.map(play_paired_chunk, tasks)
+
+    per_opponent = {opponent: [] for opponent, _, _ in opponents}
+    for task, chunk_results in zip(tasks, results):
+        per_opponent[task[2]].extend(chunk_results)
+    summaries = [
+        paired_summary(opponent, opponent_results)
+        for opponent, opponent_results in per_opponent.items()
+    ]
+    if len(summaries) > 1:
+        summaries.append(combine_summaries(summaries))
+    return summaries
+
+
+def format_paired(summary, width=12):
+    return (
+        f"vs {summary['opponent']:<{width}} "
+        f"A {summary['score_a']:.3f}  B {summary['score_b']:.3f}  "
+        f"A - B {summary['difference']:+.3f} ± {summary['se']:.3f} "
+        f"[{summary['ci_low']:+.3f}, {summary['ci_high']:+.3f}] | "
+        f"unpaired ± {summary['independent_se']:.3f}, "
+        f"{summary['variance_reduction']:.1f}x fewer battles"
+    )
+
+
+def write_csv(path, rows):
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def write_json(path, teams, battles, seed, rows, test=None):
+    results = {"teams": teams, "battles": battles, "seed": seed}
+    if test is not None:
+        results["sequential_test"] = {
+            "margin": test.margin,
+            "alpha": test.alpha,
+            "beta": test.beta,
+        }
+    results["matchups"] = rows
+    with open(path, "w") as f:
+        json.dump(results, f, indent=4)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Play every pairing of a set of warbands and report win rates."
+    )
+    parser.add_argument(
+        "teams",
+        nargs="*",
+        default=["co.json", "cs.json", "ss.json", "ug.json", "ai_opponent_team.json"],
+        metavar="TEAM[@BRAIN]",
+        help="team files, each optionally played by its own AI brain "
+        "(default: the warbands shipped with the game)",
+    )
+    parser.add_argument(
+        "-n",
+        "--battles",
+        type=int,
+        default=200,
+        help="battles per pairing; with --sequential, the most to play",
+    )
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument(
+        "--workers", type=int, default=None, help="default: one per core"
+    )
+    parser.add_argument(
+        "--brain",
+        metavar="BRAIN_FILE",
+        help="AI brain for teams without their own (default: random moves)",
+    )
+    parser.add_argument(
+        "--sequential",
+        action="store_true",
+        help="stop each pairing once a sequential test decides which side is better",
+    )
+    parser.add_argument(
+        "--margin",
+        type=float,
+        default=0.05,
+        help="sequential test: tell win rates of 0.5 - margin and 0.5 + margin apart",
+    )
+    parser.add_argument(
+        "--confidence",
+        type=float,
+        default=0.95,
+        help="sequential test: chance of picking the right side at that margin",
+    )
+    parser.add_argument(
+        "--paired",
+        nargs=2,
+        metavar=("A", "B"),
+        help="compare two entrants against the teams on common random numbers "
+        "instead of playing all pairings",
+    )
+    parser.add_argument(
+        "--antithetic",
+        action="store_true",
+        help="paired: also play each seed on its mirrored random stream",
+    )
+    parser.add_argument(
+        "--csv", metavar="PATH", help="write one row per team and opponent"
+    )
+    parser.add_argument("--json", metavar="PATH", help="write the results as JSON")
+    args = parser.parse_args()
+
+    def entrant(spec):
+        name, team_path, brain_path = parse_entrant(spec, args.brain)
+        if not os.path.exists(team_path):
+            team_path = os.path.join(script_dir, team_path)
+        return name, team_path, brain_path
+
+    if args.paired:
+        candidate_a, candidate_b = map(entrant, args.paired)
+        # Opponents whose name clashes with a candidate are left out
+        opponents = [entrant(spec) for spec in args.teams]
+        opponents = [
+            o for o in opponents if o[0] not in (candidate_a[0], candidate_b[0])
+        ]
+        if not opponents:
+            parser.error("paired comparison needs at least one opponent")
+        width = max(len(o[0]) for o in opponents + [("all", None, None)])
+        print(f"A = {candidate_a[0]}, B = {candidate_b[0]}")
+        start = time.perf_counter()
+        summaries = compare_paired(
+            candidate_a,
+            candidate_b,
+            opponents,
+            args.battles,
+            seed=args.seed,
+            workers=args.workers,
+            antithetic=args.antithetic,
+        )
+        elapsed = time.perf_counter() - start
+        for summary in summaries:
+            print(format_paired(summary, width))
+        total = 2 * sum(s["battles"] for s in summaries if s["opponent"] != "all")
+        print(f"\n{total} battles in {elapsed:.1f}s")
+        if args.csv:
+            write_csv(args.csv, summaries)
+        if args.json:
+            with open(args.json, "w") as f:
+                json.dump(
+                    {
+                        "a": candidate_a[0],
+                        "b": candidate_b[0],
+                        "battles": args.battles,
+                        "seed": args.seed,
+                        "antithetic": args.antithetic,
+                        "comparisons": summaries,
+                    },
+                    f,
+                    indent=4,
+                )
+        sys.exit()
+
+    if len(args.teams) < 2:
+        parser.error("at least two team files are needed")
+    entrants = [entrant(spec) for spec in args.teams]
+    teams = [name for name, _, _ in entrants]
+    test = None
+    if args.sequential:
+        error = 1 - args.confidence
+        test = SequentialTest(args.margin, alpha=error, beta=error)
+
+    width = max(len(team) for team in teams)
+
+    def print_pairing(rows):
+        for row in rows:
+            print(format_row(row, width))
+
+    start = time.perf_counter()
+    rows = run_matchups(
+        entrants,
+        args.battles,
+        seed=args.seed,
+        workers=args.workers,
+        test=test,
+        on_pairing=print_pairing,
+    )
+    elapsed = time.perf_counter() - start
+    total = sum(row["battles"] for row in rows) // 2
+    print(f"\n{total} battles in {elapsed:.1f}s ({total / elapsed:.0f} battles/sec)\n")
+    print(format_matrix(teams, rows))
+
+    if args.csv:
+        write_csv(args.csv, rows)
+    if args.json:
+        write_json(args.json, teams, args.battles, args.seed, rows, test)
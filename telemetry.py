@@ -0,0 +1,151 @@
+import json
+import os
+import time
+from contextlib import contextmanager
+
+# --- Training Telemetry ---
+#
+# TrainingTelemetry times the phases of each generation, counts battles and
+# summarizes fitness and brain sizes. Every generation it appends one JSON
+# line to a .jsonl file, or rewrites a Prometheus text-format file (.prom)
+# for a node_exporter textfile collector to scrape.
+
+PHASES = ("simulation", "selection", "crossover", "mutation", "bookkeeping")
+METRIC_PREFIX = "knightfight_training"
+
+
+def summarize(values):
+    values = list(values)
+    if not values:
+        return {"min": 0, "mean": 0, "max": 0}
+    return {
+        "min": min(values),
+        "mean": sum(values) / len(values),
+        "max": max(values),
+    }
+
+
+class TrainingTelemetry:
+    def __init__(self, path=None, console_interval=0.5, clock=time.perf_counter):
+        self.path = path  # None: keep the numbers in memory only
+        self.console_interval = console_interval  # Seconds between console updates
+        self.clock = clock
+        self.started = clock()
+        self.last_console = None
+        self.battles = 0
+        self.records = []
+        self._start_generation()
+
+    def _start_generation(self):
+        self.generation_started = self.clock()
+        self.generation_battles = 0
+        self.phase_seconds = dict.fromkeys(PHASES, 0.0)
+
+    @contextmanager
+    def phase(self, name):
+        start = self.clock()
+        try:
+            yield
+        finally:
+            self.phase_seconds[name] = (
+                self.phase_seconds.get(name, 0.0) + self.clock() - start
+            )
+
+    def battle_done(self):
+        self.battles += 1
+        self.generation_battles += 1
+
+    @property
+    def battles_per_sec(self):
+        elapsed = self.clock() - self.started
+        return self.battles / elapsed if elapsed > 0 else 0.0
+
+    def console_due(self):
+        """True at most once per console_interval, to throttle console output."""
+        now = self.clock()
+        if (
+            self.last_console is not None
+            and now - self.last_console < self.console_interval
+        ):
+            return False
+        self.last_console = now
+        return True
+
+    def end_generation(self, generation, fitness, brain_sizes):
+        """Record a finished generation. fitness and brain_sizes map a
+        population name to its brains' values."""
+        wall = self.clock() - self.generation_started
+        record = {
+            "generation": generation,
+            "time": time.time(),
+            "wall_seconds": wall,
+            "battles": self.generation_battles,
+            "battles_per_sec": self.generation_battles / wall if wall > 0 else 0.0,
+            "phase_seconds": self.phase_seconds,
+            "fitness": {name: summarize(v) for name, v in fitness.items()},
+            "brain_states": {name: summarize(v) for name, v in brain_sizes.items()},
+        }
+        self.records.append(record)
+        if self.path:
+            if self.path.endswith(".prom"):
+                self._write_prometheus(record)
+            else:
+                with open(self.path, "a") as f:
+                    f.write(json.dumps(record) + "\n")
+        self._start_generation()
+        return record
+
+    def _write_prometheus(self, record):
+        lines = []
+
+        def gauge(name, help_text, samples):
+            metric = f"{METRIC_PREFIX}_{name}"
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} gauge")
+            for labels, value in samples:
+                label_text = ",".join(f'{k}="{v}"' for k, v in labels.items())
+                lines.append(
+                    f"{metric}{{{label_text}}} {value}"
+                    if labels
+                    else f"{metric} {value}"
+                )
+
+        gauge("generation", "Last finished generation.", [({}, record["generation"])])
+        gauge(
+            "generation_seconds",
+            "Wall time of the last generation.",
+            [({}, record["wall_seconds"])],
+        )
+        gauge(
+            "battles_per_second",
+            "Battle throughput over the last generation.",
+            [({}, record["battles_per_sec"])],
+        )
+        gauge(
+            "phase_seconds",
+            "Time spent in each phase of the last generation.",
+            [({"phase": k}, v) for k, v in record["phase_seconds"].items()],
+        )
+        gauge(
+            "fitness",
+            "Fitness of the last generation, per population.",
+            [
+                ({"population": name, "stat": stat}, value)
+                for name, stats in record["fitness"].items()
+                for stat, value in stats.items()
+            ],
+        )
+        gauge(
+            "brain_states",
+            "States known per brain, per population.",
+            [
+                ({"population": name, "stat": stat}, value)
+                for name, stats in record["brain_states"].items()
+                for stat, value in stats.items()
+            ],
+        )
+        # Written whole and renamed, so a scrape never sees half a file
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(temp_path, self.path)
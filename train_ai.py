@@ -1,8 +1,11 @@
-import json
+import argparse
 import random
-import copy
+import gzip
 import os
+import pickle
 import sys
+from functools import partial
+from multiprocessing import Pool
 
 # Add the script's directory and parent directory to the Python path
 script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -11,13 +14,115 @@ sys.path.append(script_dir)
 sys.path.append(parent_dir)
 
 from headless_battle import HeadlessBattle
-from knight_battle_game import Knight, Player
+from knight_battle_game import Player, Warband
 from gamedata import ALL_MOVES
-from knight_ai_training import AIBrain, AIPlayer
+from knight_ai_training import AIBrain, AIPlayer, MOVE_IDS, resolve_levels
+from battle_rng import SeedStream
+from telemetry import TrainingTelemetry
 
 # --- Training Configuration ---
 GENERATIONS = 1000
 POPULATION_SIZE = 80
+# State abstraction learned into, followed by coarser levels to back off to
+# for states it has not seen; see knight_ai_training.ABSTRACTIONS
+STATE_LEVELS = ("exact", "coarse")
+# States stay in each brain's bounded exploration buffer until they have been
+# visited PROMOTE_AFTER times, so one-off states never reach the knowledge.
+EXPLORATION_LIMIT = 5000
+PROMOTE_AFTER = 2
+# The saved champion keeps only states its lineage visited this often
+MIN_VISITS_TO_SAVE = 2
+# Battles are played across this many processes; 1 plays them in-process.
+# Results are the same for any worker count.
+WORKERS = os.cpu_count() or 1
+SEED = None  # Set for a reproducible training run
+# Keep each population as a NumPy gene matrix over a shared state index and
+# evolve it with array operations; mutation then only picks moves the state's
+# knight knows. False evolves brain by brain with crossover() and mutate(),
+# and needs no third-party packages.
+COLUMNAR_POPULATION = True
+# Both populations and the RNG states are saved here every CHECKPOINT_EVERY
+# generations and when training ends; run with --resume to continue.
+CHECKPOINT_FILE = os.path.join(script_dir, "training_checkpoint.pkl.gz")
+CHECKPOINT_EVERY = 10
+# Per-generation throughput, phase timings, fitness and brain sizes are
+# appended here as JSON lines; a path ending in .prom is written in the
+# Prometheus text format instead. The progress bar redraws at most every
+# PROGRESS_INTERVAL seconds.
+TELEMETRY_FILE = os.path.join(script_dir, "training_telemetry.jsonl")
+PROGRESS_INTERVAL = 0.5
+
+
+def new_brain(parent=None, track_legal=False, levels=None):
+    """An empty training brain. It learns into `levels`, else its parent's
+    levels, else STATE_LEVELS."""
+    if levels is None:
+        levels = parent.levels if parent is not None else STATE_LEVELS
+    brain = AIBrain(
+        levels=levels,
+        exploration_limit=EXPLORATION_LIMIT,
+        promote_after=PROMOTE_AFTER,
+        track_visits=True,
+        track_legal=track_legal,
+    )
+    if parent is not None and parent.exploration is not None:
+        # Visit counts carry down the lineage so recurring states get promoted
+        brain.exploration = parent.exploration.copy()
+    return brain
+
+
+# --- Fitness Evaluation ---
+_warband = None  # Warband every training battle uses, compiled once per process
+
+
+def init_worker(team_file_path):
+    global _warband
+    _warband = Warband.from_file(team_file_path)
+
+
+def play_match(task):
+    """Play one training battle. Only the learner's brain records anything;
+    the opponent fights as a frozen copy. Returns the battle log and the
+    learner's brain."""
+    brain1, brain2, seed, learner = task
+    if learner == 1:
+        brain2 = brain2.sparring_copy()
+    else:
+        brain1 = brain1.sparring_copy()
+    p1 = Player("AI 1", _warband.knights())
+    p1.ai_logic = brain1
+    p2 = Player("AI 2", _warband.knights())
+    p2.ai_logic = brain2
+    log = HeadlessBattle(p1, p2, seed=seed).run_simulation()
+    return log, brain1 if learner == 1 else brain2
+
+
+def evaluate_population(pool, learners, opponents, learner, seeds, on_result):
+    """Battle every learner against a random opponent and record its fitness.
+    Pairings are drawn here and battle seeds taken from the `seeds`
+    SeedStream, in order, so the outcome does not depend on how many
+    workers play the battles."""
+    tasks = []
+    for ai_player in learners:
+        opponent = random.choice(opponents).brain
+        seed = seeds.next_seed()
+        if learner == 1:
+            tasks.append((ai_player.brain, opponent, seed, 1))
+        else:
+            tasks.append((opponent, ai_player.brain, seed, 2))
+
+    if pool is None:
+        results = map(play_match, tasks)
+    else:
+        chunksize = max(1, len(tasks) // (WORKERS * 4))
+        results = pool.imap(play_match, tasks, chunksize)
+
+    player_name = f"AI {learner}"
+    for ai_player, (log, brain) in zip(learners, results):
+        # Workers send back the brain they trained; in-process it is the same one
+        ai_player.brain = brain
+        brain.fitness = calculate_fitness(log, player_name)
+        on_result()
 
 
 def print_progress_bar(iteration, total, prefix="", suffix="", length=50, fill="█"):
@@ -47,16 +152,29 @@ def calculate_fitness(battle_log, player_name):
 
 
 def crossover(parent1, parent2):
+    # A gene comes from a coin-flipped parent; if that parent lacks the
+    # state, the child simply does not have it either.
     child_knowledge = {}
-    all_keys = set(parent1.knowledge.keys()) | set(parent2.knowledge.keys())
-    for key in all_keys:
-        if random.random() < 0.5:
-            child_knowledge[key] = parent1.knowledge.get(key)
-        else:
-            child_knowledge[key] = parent2.knowledge.get(key)
-
-    child = AIBrain()
+    knowledge1, knowledge2 = parent1.knowledge, parent2.knowledge
+    for key, move_name in knowledge1.items():
+        if key in knowledge2:
+            if random.random() >= 0.5:
+                move_name = knowledge2[key]
+        elif random.random() >= 0.5:
+            continue
+        child_knowledge[key] = move_name
+    for key, move_name in knowledge2.items():
+        if key not in knowledge1 and random.random() >= 0.5:
+            child_knowledge[key] = move_name
+
+    child = new_brain(parent1)
     child.knowledge = child_knowledge
+    if parent1.visits is not None and parent2.visits is not None:
+        visits1, visits2 = parent1.visits, parent2.visits
+        child.visits = {
+            key: max(visits1.get(key, 0), visits2.get(key, 0))
+            for key in child_knowledge
+        }
     return child
 
 
@@ -68,90 +186,272 @@ def mutate(brain, all_moves):
     return brain
 
 
-def run_training_session(generations, population_size):
+# --- Checkpoints ---
+def save_checkpoint(path, checkpoint):
+    """Write a checkpoint atomically: a crash mid-write leaves the previous
+    checkpoint in place."""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as raw:
+        with gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=1) as f:
+            pickle.dump(checkpoint, f, protocol=pickle.HIGHEST_PROTOCOL)
+        raw.flush()
+        os.fsync(raw.fileno())
+    os.replace(temp_path, path)
+
+
+def load_checkpoint(path):
+    with gzip.open(path, "rb") as f:
+        return pickle.load(f)
+
+
+def warm_start_brains(brain_file, count, track_legal):
+    """`count` brains that all start from the knowledge in brain_file.
+
+    Saved keys are hashes, so they cannot be re-keyed into other levels. The
+    brains use STATE_LEVELS when those include every level the file was
+    saved with, and the file's own levels otherwise."""
+    if not os.path.exists(brain_file):
+        raise FileNotFoundError(f"No brain file at {brain_file}")
+    saved = AIBrain(brain_file)
+    levels = resolve_levels(STATE_LEVELS)
+    if not set(saved.level_names()) <= {level.name for level in levels}:
+        levels = saved.levels
+    knowledge = dict(saved.knowledge.items())
+    # The saved file does not say which knight learned each state, so any
+    # move on the team counts as legal for it
+    legal = tuple(
+        sorted(
+            {MOVE_IDS[m.name] for knight in _warband.knights() for m in knight.moves}
+        )
+    )
+    brains = []
+    for _ in range(count):
+        brain = new_brain(track_legal=track_legal, levels=levels)
+        brain.knowledge = dict(knowledge)
+        # Enough visits that states nobody revisits still survive compact()
+        brain.visits = dict.fromkeys(knowledge, MIN_VISITS_TO_SAVE)
+        if track_legal:
+            brain.legal_moves = dict.fromkeys(knowledge, legal)
+        brains.append(brain)
+    return brains
+
+
+def evolve_population(population, population_size, all_moves, phase):
+    """The next generation of a list-of-AIPlayers population: the top 2 carry
+    over, the rest are mutated children of two of the top 5."""
+    with phase("selection"):
+        population.sort(key=lambda p: p.brain.fitness, reverse=True)
+    name = population[0].name
+    new_population = population[:2]
+    while len(new_population) < population_size:
+        with phase("selection"):
+            parent1, parent2 = random.choices(population[:5], k=2)
+        with phase("crossover"):
+            child_brain = crossover(parent1.brain, parent2.brain)
+        with phase("mutation"):
+            child_brain = mutate(child_brain, all_moves)
+
+        new_population.append(AIPlayer(name, brain=child_brain))
+    return new_population
+
+
+def run_training_session(
+    generations,
+    population_size,
+    resume=False,
+    warm_start=None,
+    telemetry_file=TELEMETRY_FILE,
+):
+    """Train for `generations` generations in total. With resume, continue
+    from CHECKPOINT_FILE if there is one; with warm_start, seed both
+    populations from that brain file instead of empty brains."""
     print("Initializing AI populations for training...")
 
     team_file_path = os.path.join(script_dir, "ai_opponent_team.json")
     all_moves = list(ALL_MOVES.keys())
+    init_worker(team_file_path)
 
-    population1 = [AIPlayer("AI 1", team_file_path) for _ in range(population_size)]
-    population2 = [AIPlayer("AI 2", team_file_path) for _ in range(population_size)]
+    checkpoint = None
+    if resume:
+        if os.path.exists(CHECKPOINT_FILE):
+            checkpoint = load_checkpoint(CHECKPOINT_FILE)
+            print(f"Resuming from generation {checkpoint['generation']}")
+        else:
+            print(f"No checkpoint at {CHECKPOINT_FILE}; starting fresh")
+
+    if checkpoint is not None:
+        start_gen = checkpoint["generation"]
+        battles_completed = checkpoint["battles_completed"]
+        random.setstate(checkpoint["random_state"])
+        seed_stream = checkpoint["seed_stream"]
+        levels = resolve_levels(checkpoint["levels"])
+        np_rng = None
+        if checkpoint["columnar"]:
+            import numpy as np
+
+            columns1, columns2 = checkpoint["populations"]
+            columns1.brain_factory = columns2.brain_factory = partial(
+                new_brain, track_legal=True, levels=levels
+            )
+            population_size = columns1.size
+            np_rng = np.random.default_rng()
+            np_rng.bit_generator.state = checkpoint["numpy_state"]
+        else:
+            columns1 = columns2 = None
+            brains1, brains2 = checkpoint["populations"]
+            population_size = len(brains1)
+            population1 = [AIPlayer("AI 1", brain=b) for b in brains1]
+            population2 = [AIPlayer("AI 2", brain=b) for b in brains2]
+    else:
+        start_gen = battles_completed = 0
+        if SEED is not None:
+            random.seed(SEED)
+        seed_stream = SeedStream(random.getrandbits(64))
+        brains1 = brains2 = None
+        levels = resolve_levels(STATE_LEVELS)
+        if warm_start:
+            brains1 = warm_start_brains(
+                warm_start, population_size, COLUMNAR_POPULATION
+            )
+            brains2 = warm_start_brains(
+                warm_start, population_size, COLUMNAR_POPULATION
+            )
+            print(f"Warm-started from {warm_start}")
+            if brains1[0].levels != levels:
+                levels = brains1[0].levels
+                print(
+                    f"It was saved with state levels {brains1[0].level_names()}; "
+                    "training with those instead of STATE_LEVELS"
+                )
+        columns1 = columns2 = np_rng = None
+        if COLUMNAR_POPULATION:
+            # Only the columnar path needs NumPy
+            import numpy as np
+            from brain_population import BrainPopulation
+
+            np_rng = np.random.default_rng(random.getrandbits(64))
+            factory = partial(new_brain, track_legal=True, levels=levels)
+            columns1 = BrainPopulation(population_size, factory)
+            columns2 = BrainPopulation(population_size, factory)
+            if warm_start:
+                columns1.absorb(brains1)
+                columns2.absorb(brains2)
+        else:
+            brains1 = brains1 or [
+                new_brain(levels=levels) for _ in range(population_size)
+            ]
+            brains2 = brains2 or [
+                new_brain(levels=levels) for _ in range(population_size)
+            ]
+            population1 = [AIPlayer("AI 1", brain=b) for b in brains1]
+            population2 = [AIPlayer("AI 2", brain=b) for b in brains2]
 
     total_battles = generations * population_size * 2
-    battles_completed = 0
-
-    print_progress_bar(0, total_battles, prefix="Training Progress:", suffix="Complete")
-
-    for gen in range(generations):
-        # --- Train Population 1 vs Population 2 ---
-        for ai_p1 in population1:
-            ai_p2 = random.choice(population2)
+    telemetry = TrainingTelemetry(telemetry_file, console_interval=PROGRESS_INTERVAL)
 
-            p1 = Player("AI 1", [Knight(kd) for kd in json.load(open(team_file_path))])
-            p1.ai_logic = ai_p1
-            p2 = Player("AI 2", [Knight(kd) for kd in json.load(open(team_file_path))])
-            p2.ai_logic = ai_p2
-
-            battle = HeadlessBattle(p1, p2)
-            log = battle.run_simulation()
-            ai_p1.brain.fitness = calculate_fitness(log, "AI 1")
-            battles_completed += 1
+    def battle_done():
+        nonlocal battles_completed
+        battles_completed += 1
+        telemetry.battle_done()
+        if battles_completed == total_battles or telemetry.console_due():
             print_progress_bar(
                 battles_completed,
                 total_battles,
                 prefix="Training Progress:",
-                suffix="Complete",
+                suffix=f"Complete ({telemetry.battles_per_sec:.0f} battles/s)",
             )
 
-        # --- Train Population 2 vs Population 1 ---
-        for ai_p2 in population2:
-            ai_p1 = random.choice(population1)
-
-            p1 = Player("AI 1", [Knight(kd) for kd in json.load(open(team_file_path))])
-            p1.ai_logic = ai_p1
-            p2 = Player("AI 2", [Knight(kd) for kd in json.load(open(team_file_path))])
-            p2.ai_logic = ai_p2
-
-            battle = HeadlessBattle(p1, p2)
-            log = battle.run_simulation()
-            ai_p2.brain.fitness = calculate_fitness(log, "AI 2")
-            battles_completed += 1
-            print_progress_bar(
-                battles_completed,
-                total_battles,
-                prefix="Training Progress:",
-                suffix="Complete",
+    def checkpoint_at(generation):
+        if columns1 is not None:
+            populations = (columns1, columns2)
+        else:
+            populations = (
+                [p.brain for p in population1],
+                [p.brain for p in population2],
             )
+        save_checkpoint(
+            CHECKPOINT_FILE,
+            {
+                "generation": generation,
+                "battles_completed": battles_completed,
+                "random_state": random.getstate(),
+                "seed_stream": seed_stream,
+                "levels": [level.name for level in levels],
+                "columnar": columns1 is not None,
+                "numpy_state": np_rng.bit_generator.state if np_rng else None,
+                "populations": populations,
+            },
+        )
 
-        # Evolve Population 1
-        population1.sort(key=lambda p: p.brain.fitness, reverse=True)
-        new_pop1 = population1[:2]
-        while len(new_pop1) < population_size:
-            parent1, parent2 = random.choices(population1[:5], k=2)
-            child_brain = crossover(parent1.brain, parent2.brain)
-            child_brain = mutate(child_brain, all_moves)
-
-            new_ai_player = AIPlayer("AI 1", team_file_path)
-            new_ai_player.brain = child_brain
-            new_pop1.append(new_ai_player)
-        population1 = new_pop1
+    pool = None
+    if WORKERS > 1:
+        pool = Pool(WORKERS, initializer=init_worker, initargs=(team_file_path,))
 
-        # Evolve Population 2
-        population2.sort(key=lambda p: p.brain.fitness, reverse=True)
-        new_pop2 = population2[:2]
-        while len(new_pop2) < population_size:
-            parent1, parent2 = random.choices(population2[:5], k=2)
-            child_brain = crossover(parent1.brain, parent2.brain)
-            child_brain = mutate(child_brain, all_moves)
-
-            new_ai_player = AIPlayer("AI 2", team_file_path)
-            new_ai_player.brain = child_brain
-            new_pop2.append(new_ai_player)
-        population2 = new_pop2
+    print_progress_bar(
+        battles_completed, total_battles, prefix="Training Progress:", suffix="Complete"
+    )
 
+    try:
+        for gen in range(start_gen, generations):
+            if columns1 is not None:
+                with telemetry.phase("bookkeeping"):
+                    population1 = [AIPlayer("AI 1", brain=b) for b in columns1.brains()]
+                    population2 = [AIPlayer("AI 2", brain=b) for b in columns2.brains()]
+
+            with telemetry.phase("simulation"):
+                # --- Train Population 1 vs Population 2 ---
+                evaluate_population(
+                    pool, population1, population2, 1, seed_stream, battle_done
+                )
+
+                # --- Train Population 2 vs Population 1 ---
+                evaluate_population(
+                    pool, population2, population1, 2, seed_stream, battle_done
+                )
+
+            fitness = {
+                "1": [p.brain.fitness for p in population1],
+                "2": [p.brain.fitness for p in population2],
+            }
+            brain_sizes = {
+                "1": [len(p.brain.knowledge) for p in population1],
+                "2": [len(p.brain.knowledge) for p in population2],
+            }
+
+            if columns1 is not None:
+                with telemetry.phase("bookkeeping"):
+                    columns1.absorb([p.brain for p in population1])
+                    columns2.absorb([p.brain for p in population2])
+                columns1.evolve(np_rng, phase=telemetry.phase)
+                columns2.evolve(np_rng, phase=telemetry.phase)
+            else:
+                population1 = evolve_population(
+                    population1, population_size, all_moves, telemetry.phase
+                )
+                population2 = evolve_population(
+                    population2, population_size, all_moves, telemetry.phase
+                )
+
+            if (gen + 1) % CHECKPOINT_EVERY == 0 or gen + 1 == generations:
+                with telemetry.phase("bookkeeping"):
+                    checkpoint_at(gen + 1)
+            telemetry.end_generation(gen + 1, fitness, brain_sizes)
+    except KeyboardInterrupt:
+        if pool is not None:
+            pool.terminate()
+        print(
+            "\n\nTraining interrupted; run with --resume to continue from the last checkpoint."
+        )
+        return
+    if pool is not None:
+        pool.close()
+        pool.join()
     print("\n")
 
     # --- Final Selection ---
+    if columns1 is not None:
+        population1 = [AIPlayer("AI 1", brain=columns1.best_brain())]
+        population2 = [AIPlayer("AI 2", brain=columns2.best_brain())]
     best_ai_player1 = population1[0]
     best_ai_player2 = population2[0]
 
@@ -167,9 +467,37 @@ def run_training_session(generations, population_size):
         )
 
     champion_brain.brain_file = os.path.join(script_dir, "ai_brain.json")
+    champion_brain.compact(min_visits=MIN_VISITS_TO_SAVE)
     champion_brain.save_knowledge()
     print(f"Saved champion brain to ai_brain.json")
 
 
 if __name__ == "__main__":
-    run_training_session(GENERATIONS, POPULATION_SIZE)
+    parser = argparse.ArgumentParser(description="Evolve the AI brain.")
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help=f"continue from the checkpoint in {os.path.basename(CHECKPOINT_FILE)}",
+    )
+    parser.add_argument(
+        "--warm-start",
+        metavar="BRAIN_FILE",
+        help="seed both populations from a trained brain, e.g. ai_brain.json",
+    )
+    parser.add_argument(
+        "--telemetry",
+        metavar="PATH",
+        default=TELEMETRY_FILE,
+        help="per-generation metrics file: .jsonl, or .prom for Prometheus",
+    )
+    args = parser.parse_args()
+    try:
+        run_training_session(
+            GENERATIONS,
+            POPULATION_SIZE,
+            resume=args.resume,
+            warm_start=args.warm_start,
+            telemetry_file=args.telemetry,
+        )
+    except FileNotFoundError as e:
+        sys.exit(f"Cannot train: {e}")